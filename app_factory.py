@@ -1,5 +1,4 @@
 from flask import Flask
-from models import db
 import os
 
 def create_app():
@@ -12,7 +11,22 @@ def create_app():
     app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     
-    # Initialize SQLAlchemy without creating tables
-    db.init_app(app)
+    # Memoized recommendations: entry count and time-to-live in seconds
+    app.config['RECOMMENDATION_CACHE_SIZE'] = int(os.environ.get('RECOMMENDATION_CACHE_SIZE', 4096))
+    app.config['RECOMMENDATION_CACHE_TTL'] = float(os.environ.get('RECOMMENDATION_CACHE_TTL', 300))
+    
+    # JSON API bodies at least this many bytes are gzip/brotli compressed when accepted
+    app.config['RESPONSE_COMPRESS_MIN_SIZE'] = int(os.environ.get('RESPONSE_COMPRESS_MIN_SIZE', 1024))
+    
+    # Seconds between checks for catalog changes to hot reload; 0 disables
+    app.config['CATALOG_RELOAD_INTERVAL'] = float(os.environ.get('CATALOG_RELOAD_INTERVAL', 5))
     
+    # The ORM models are only used by admin tooling (see init_models); the
+    # serving path reads the compiled catalog and never imports SQLAlchemy
     return app
+
+def init_models(app):
+    """Bind the Flask-SQLAlchemy models to app, importing them on first use"""
+    from models import db
+    db.init_app(app)
+    return db
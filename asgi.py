@@ -0,0 +1,233 @@
+"""ASGI entry point: ``uvicorn asgi:app`` or ``gunicorn -k uvicorn.workers.UvicornWorker asgi:app``.
+
+The recommendation API is answered natively from the in-memory catalog,
+without Flask's request machinery; requests Flask would reject (bodies
+that are not JSON) are handed to Flask so both modes answer them alike.
+Other routes go through a WSGI bridge: the request body is received on
+the event loop into a spooled temporary file (in memory up to
+SPOOL_MAX_MEMORY, on disk beyond), and the response is streamed out, so
+bulk uploads and NDJSON results are not held in memory whole. The native
+handlers and all other blocking work (scoring, waiting on a
+recommendation another request is already computing, catalog
+compilation, the Flask views behind every other route) run on a thread
+pool, and only once their body has arrived: the event loop does all I/O,
+and slow clients never tie up a pool thread.
+"""
+import asyncio
+import contextvars
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import main
+from catalog import get_catalog
+from metrics import registry, start_profile, stop_profile, server_timing
+from responses import encode, compress
+
+executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('ASGI_THREADS', 8)),
+    thread_name_prefix='asgi-worker',
+)
+
+# Bridged request bodies larger than this are spooled to a temporary file
+SPOOL_MAX_MEMORY = 1024 * 1024
+
+# (method, path) -> (handler taking the decoded JSON body, Flask endpoint name)
+ROUTES = {
+    ('POST', '/api/recommend'): (main.recommend_response, 'api_recommend'),
+    ('POST', '/api/recommend/batch'): (main.batch_response, 'api_recommend_batch'),
+}
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    route = ROUTES.get((scope['method'], scope['path']))
+    if route is None:
+        body, size = await _spool_body(receive)
+        with body:
+            await _call_flask(scope, body, send, size)
+        return
+
+    handler, endpoint = route
+    started = time.perf_counter()
+    headers = dict(scope.get('headers', []))
+    body = await _read_body(receive)
+    payload = _json_payload(headers, body)
+    if payload is None:
+        # Flask answers missing, malformed or non-JSON bodies with its own errors
+        await _call_flask(scope, io.BytesIO(body), send, len(body))
+        return
+
+    token = start_profile() if headers.get(b'x-profile') else None
+    # Cache misses score and coalesced requests wait on the leader's
+    # Future, both blocking; run with this context so spans land in
+    # the request profile
+    call = partial(contextvars.copy_context().run, handler, payload)
+    result, status = await asyncio.get_running_loop().run_in_executor(executor, call)
+
+    elapsed = time.perf_counter() - started
+    registry.histogram('crop_http_request_seconds', 'HTTP request latency',
+                       endpoint=endpoint).observe(elapsed)
+    extra_headers = []
+    accept_encoding = headers.get(b'accept-encoding', b'').decode('latin-1')
+    if token is not None:
+        spans = stop_profile(token) + [('total', elapsed)]
+        extra_headers.append((b'server-timing', server_timing(spans).encode('latin-1')))
+    await _send_json(send, result, status, accept_encoding, extra_headers)
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            # Compiling the catalog and its engine and index reads SQLite and
+            # takes a while; keep it off the event loop and out of the first request
+            await asyncio.get_running_loop().run_in_executor(executor, lambda: get_catalog().prime())
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            executor.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body', False):
+            break
+    return b''.join(chunks)
+
+async def _spool_body(receive):
+    """(rewound file holding the request body, its size), received on the event loop"""
+    body = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        chunk = message.get('body', b'')
+        # Page-cache writes, even once spooled to disk; only the client is slow
+        body.write(chunk)
+        size += len(chunk)
+        if not message.get('more_body', False):
+            break
+    body.seek(0)
+    return body, size
+
+def _json_payload(headers, body):
+    """Decoded body as request.get_json() would give it, or None when Flask would not"""
+    mimetype = headers.get(b'content-type', b'').split(b';')[0].strip().lower()
+    if not (mimetype == b'application/json'
+            or (mimetype.startswith(b'application/') and mimetype.endswith(b'+json'))):
+        return None
+    try:
+        return json.loads(body)
+    except ValueError:
+        return None
+
+async def _send_json(send, result, status, accept_encoding='', extra_headers=()):
+    # Same encoding and compression as main.json_response so both serving modes match
+    body, coding = compress(encode(result), accept_encoding,
+                            main.app.config['RESPONSE_COMPRESS_MIN_SIZE'])
+    headers = [
+        (b'content-type', b'application/json'),
+        (b'content-length', str(len(body)).encode('latin-1')),
+        (b'vary', b'Accept-Encoding'),
+        *extra_headers,
+    ]
+    if coding is not None:
+        headers.append((b'content-encoding', coding.encode('latin-1')))
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+def _wsgi_environ(scope, stream, content_length=None):
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'],
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'REMOTE_ADDR': client[0],
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': stream,
+        # The stream ends with the body, so chunked uploads can be read too
+        'wsgi.input_terminated': True,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if content_length is not None:
+        environ['CONTENT_LENGTH'] = str(content_length)
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            environ.setdefault(name, value)
+        else:
+            key = f'HTTP_{name}'
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+def _start_wsgi(environ):
+    """Call the Flask app; returns (status, headers, first body chunks, body iterable)"""
+    response = {}
+    written = []
+
+    def start_response(status, headers, exc_info=None):
+        response['status'] = int(status.split(' ', 1)[0])
+        response['headers'] = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+        return written.append
+
+    result = main.app(environ, start_response)
+    chunks = iter(result)
+    # WSGI apps may defer start_response to their first chunk
+    first = next(chunks, None)
+    if first is not None:
+        written.append(first)
+    return response['status'], response['headers'], written, result, chunks
+
+def _finish_wsgi(result):
+    if hasattr(result, 'close'):
+        result.close()
+
+async def _call_flask(scope, stream, send, content_length=None):
+    """Serve a request through the Flask app on the thread pool, streaming the body out"""
+    loop = asyncio.get_running_loop()
+    # One context for the whole response: streamed views resume in it on
+    # whichever pool thread pulls their next chunk
+    context = contextvars.copy_context()
+
+    def run(func, *args):
+        return loop.run_in_executor(executor, partial(context.run, func, *args))
+
+    status, headers, written, result, chunks = await run(
+        _start_wsgi, _wsgi_environ(scope, stream, content_length))
+    try:
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        for chunk in written:
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        while True:
+            chunk = await run(next, chunks, None)
+            if chunk is None:
+                break
+            if chunk:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        await run(_finish_wsgi, result)
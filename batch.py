@@ -0,0 +1,137 @@
+import numpy as np
+from scoring import MIN_SCORE
+
+# Upper bound on condition sets accepted in one batch request
+MAX_BATCH_SIZE = 100000
+# Rows x crops scored at once; bounds the score matrices of a block
+CELL_BUDGET = 4_000_000
+
+# Numeric checks in the order validate_input applies them
+NUMERIC_FIELDS = (
+    ('temperature', 0, 50, "Temperature must be between 0°C and 50°C"),
+    ('rainfall', 0, 5000, "Rainfall must be between 0mm and 5000mm"),
+    ('humidity', 0, 100, "Humidity must be between 0% and 100%"),
+    ('ph', 0, 14, "pH must be between 0 and 14"),
+)
+SOIL_TYPES = ('clay', 'loam', 'sandy')
+FIELDS = tuple(field for field, _, _, _ in NUMERIC_FIELDS) + ('soil_type',)
+
+def columns_from_payload(payload):
+    """Normalize a batch payload into equal-length columns.
+
+    Accepts a list of condition objects, ``{"conditions": [...]}`` or the
+    columnar form ``{"columns": {"temperature": [...], ...}}``. Raises
+    ValueError when the payload shape itself is unusable.
+    """
+    if isinstance(payload, dict) and 'columns' in payload:
+        columns = payload['columns']
+        if not isinstance(columns, dict):
+            raise ValueError("'columns' must be an object of equal-length arrays")
+        lengths = {len(v) for v in columns.values() if isinstance(v, list)}
+        if len(lengths) != 1 or any(not isinstance(v, list) for v in columns.values()):
+            raise ValueError("'columns' must be an object of equal-length arrays")
+        size = lengths.pop()
+        columns = {field: columns.get(field, [None] * size) for field in FIELDS}
+    else:
+        rows = payload.get('conditions') if isinstance(payload, dict) else payload
+        if not isinstance(rows, list):
+            raise ValueError("Expected a list of condition sets or a 'columns' object")
+        rows = [row if isinstance(row, dict) else {} for row in rows]
+        size = len(rows)
+        columns = {field: [row.get(field) for row in rows] for field in FIELDS}
+
+    if size > MAX_BATCH_SIZE:
+        raise ValueError(f"Batch too large: {size} rows (maximum {MAX_BATCH_SIZE})")
+    return columns, size
+
+def _to_float(values):
+    """Convert a column to float64, returning the array and a not-a-number mask"""
+    raw = np.fromiter(values, dtype=object, count=len(values))
+    missing = np.equal(raw, None)
+    if not missing.any():
+        try:
+            return raw.astype(np.float64), missing
+        except (TypeError, ValueError):
+            pass
+    out = np.full(len(raw), np.nan)
+    bad = np.zeros(len(raw), dtype=bool)
+    for i, value in enumerate(raw):
+        try:
+            out[i] = float(value)
+        except (TypeError, ValueError):
+            bad[i] = True
+    return out, bad
+
+def validate_batch(columns, size):
+    """Validate every row at once with the same rules and messages as validate_input.
+
+    Returns the numeric columns as float arrays, the soil column and a list of
+    per-row error lists (empty for valid rows).
+    """
+    values = {}
+    messages = []
+    alive = np.ones(size, dtype=bool)
+    for field, low, high, message in NUMERIC_FIELDS:
+        column, bad = _to_float(columns[field])
+        values[field] = column
+        with np.errstate(invalid='ignore'):
+            out_of_range = ~((low <= column) & (column <= high))
+        messages.append((alive & ~bad & out_of_range, message))
+        messages.append((alive & bad, "All values must be numbers"))
+        alive &= ~bad
+
+    soils = np.fromiter(columns['soil_type'], dtype=object, count=size)
+    valid_soil = np.fromiter((s in SOIL_TYPES for s in soils), dtype=bool, count=size)
+    messages.append((~valid_soil, "Invalid soil type"))
+
+    errors = [[] for _ in range(size)]
+    for mask, message in messages:
+        for i in np.flatnonzero(mask):
+            errors[i].append(message)
+    return values, soils, errors
+
+def score_batch(engine, values, soils, season_masks, limit=None, min_score=MIN_SCORE):
+    """Rank each row's recommendable crops; returns one (crop indices, scores) pair per row.
+
+    Crops are ordered by descending score, ties in catalog order; only
+    recommendable crops scoring at least min_score are included, at most
+    limit per row. season_masks is one mask for every row or one per row.
+    Rows are scored in blocks of at most CELL_BUDGET rows x crops, so
+    memory is bounded by the block and the rankings returned.
+    """
+    size = len(soils)
+    soil_masks = np.fromiter(
+        (engine.soil_mask_for(s) if isinstance(s, str) else 0 for s in soils),
+        dtype=np.int64, count=size)
+    season_masks = np.broadcast_to(np.asarray(season_masks, dtype=np.int64), (size,))
+    step = max(1, CELL_BUDGET // max(len(engine), 1))
+    rankings = []
+    for start in range(0, size, step):
+        rows = slice(start, start + step)
+        rankings += _rank_block(
+            engine, values['temperature'][rows], values['rainfall'][rows], soil_masks[rows],
+            values['ph'][rows], season_masks[rows], limit, min_score)
+    return rankings
+
+def _rank_block(engine, temps, rainfalls, soil_masks, phs, season_masks, limit, min_score):
+    with np.errstate(invalid='ignore'):
+        scores, eligible = engine.evaluate(temps, rainfalls, soil_masks, phs, season_masks)
+    eligible &= scores >= min_score
+    counts = eligible.sum(axis=1)
+    n = scores.shape[1]
+    # Unique per-row keys: higher score first, then lower crop index
+    keys = np.where(eligible, scores, -1) * n + (n - 1 - np.arange(n))
+    if limit is not None and limit < n:
+        counts = np.minimum(counts, limit)
+        # Partial selection of each row's top limit columns; only those get sorted
+        top = np.argpartition(-keys, limit - 1, axis=1)[:, :limit]
+        order = np.take_along_axis(
+            top, np.argsort(-np.take_along_axis(keys, top, axis=1), axis=1), axis=1)
+    else:
+        order = np.argsort(-keys, axis=1)
+    # Keep only each row's ranked prefix so the block's matrices can be freed
+    ranked = np.arange(order.shape[1]) < counts[:, None]
+    crops = order[ranked]
+    ranked_scores = np.take_along_axis(scores, order, axis=1)[ranked]
+    bounds = np.cumsum(counts)[:-1]
+    return list(zip(np.split(crops, bounds), np.split(ranked_scores, bounds)))
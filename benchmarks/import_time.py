@@ -0,0 +1,69 @@
+"""Import-time budget for the serving entry point: python -m benchmarks.import_time
+
+Imports the serving module (main by default) in fresh interpreters under
+`python -X importtime`, prints the slowest top-level imports of the
+fastest run and exits non-zero when the total exceeds --budget-ms or
+when a module kept off the serving path (the ORM, pandas) was imported.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+# Only admin tooling and bulk jobs may import these
+DEFERRED_MODULES = ('flask_sqlalchemy', 'sqlalchemy', 'pandas', 'pyarrow')
+DEFAULT_BUDGET_MS = 1000
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def import_times(module):
+    """[(module, self_us, cumulative_us, depth)] for one cold import of module"""
+    env = dict(os.environ, CATALOG_RELOAD_INTERVAL='0')
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, env=env, capture_output=True, text=True)
+    if proc.returncode:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        head, cumulative_us, name = line.split('|')
+        # One space after the bar, then two per nesting level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), int(head.split(':')[1]), int(cumulative_us), depth))
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check the import time of the serving entry point')
+    parser.add_argument('--module', default='main', help='module to import (default: main)')
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS,
+                        help='maximum total import time in milliseconds')
+    parser.add_argument('--runs', type=int, default=3, help='cold imports to take the fastest of')
+    parser.add_argument('--top', type=int, default=10, help='slowest top-level imports to list')
+    args = parser.parse_args(argv)
+
+    runs = [import_times(args.module) for _ in range(max(args.runs, 1))]
+    totals = [next(cum for name, _, cum, _ in rows if name == args.module) for rows in runs]
+    rows = runs[totals.index(min(totals))]
+    total_ms = min(totals) / 1000
+
+    print(f"import {args.module}: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    # Direct imports of the module, slowest first
+    top_level = sorted((r for r in rows if r[3] == 1),
+                       key=lambda r: r[2], reverse=True)
+    for name, _, cumulative_us, _ in top_level[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    failures = []
+    if total_ms > args.budget_ms:
+        failures.append(f"import took {total_ms:.1f} ms, over the {args.budget_ms:.0f} ms budget")
+    imported = {name for name, _, _, _ in rows}
+    for module in DEFERRED_MODULES:
+        if module in imported:
+            failures.append(f"{module} is imported on the serving path")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,243 @@
+"""Benchmark harness: python -m benchmarks.run --help
+
+Builds synthetic catalogs, micro-benchmarks the scoring and validation
+functions on the legacy and optimized paths, load-tests the HTTP routes
+through the Flask test client and writes the results as JSON. With
+--compare it exits non-zero when any metric regressed past --threshold.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from functools import partial
+import numpy as np
+from benchmarks.synthetic import generate_catalog, random_conditions
+
+DEFAULT_SIZES = (18, 1000, 10000, 100000)
+
+def summarize(latencies_ns, elapsed_s=None):
+    """Latency percentiles in microseconds plus throughput"""
+    lat = np.asarray(latencies_ns, dtype=np.float64) / 1000.0
+    elapsed_s = elapsed_s if elapsed_s is not None else lat.sum() / 1e6
+    return {
+        'calls': int(lat.size),
+        'mean_us': round(float(lat.mean()), 3),
+        'p50_us': round(float(np.percentile(lat, 50)), 3),
+        'p95_us': round(float(np.percentile(lat, 95)), 3),
+        'p99_us': round(float(np.percentile(lat, 99)), 3),
+        'ops_per_sec': round(lat.size / elapsed_s, 1) if elapsed_s else None,
+    }
+
+def time_calls(fn, inputs):
+    latencies = []
+    for arg in inputs:
+        start = time.perf_counter_ns()
+        fn(arg)
+        latencies.append(time.perf_counter_ns() - start)
+    return summarize(latencies)
+
+def legacy_recommend(db_path, conditions):
+    """recommend_crop as it was before the compiled catalog: SQL scan plus per-crop scoring"""
+    import main
+    temp = float(conditions['temperature'])
+    rainfall = float(conditions['rainfall'])
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute('''
+            SELECT name, temp_min, temp_max, rain_min, rain_max, ph_min, ph_max,
+                   humidity_min, humidity_max, soil_types, seasons, nutrients
+            FROM crops
+            WHERE (? BETWEEN temp_min AND temp_max)
+            AND (? BETWEEN rain_min AND rain_max)
+            AND soil_types LIKE ?
+        ''', (temp, rainfall, f"%{conditions['soil_type'].lower()}%")).fetchall()
+    finally:
+        conn.close()
+    scores = {}
+    for name, t0, t1, r0, r1, p0, p1, h0, h1, soils, seasons, nutrients in rows:
+        crop_info = {
+            'name': name,
+            'temp_range': (t0, t1), 'rainfall_range': (r0, r1),
+            'ph_range': (p0, p1), 'humidity_range': (h0, h1),
+            'soil_types': [s.strip() for s in soils.split(',')],
+            'seasons': [s.strip() for s in seasons.split(',')],
+            'nutrients': json.loads(nutrients),
+        }
+        score = main.calculate_crop_score(crop_info, conditions)
+        if score >= 60:
+            scores[name] = score
+    return dict(sorted(scores.items(), key=lambda x: x[1], reverse=True))
+
+def micro_benchmarks(db_path, catalog, conditions, iterations):
+    import main
+    from batch import columns_from_payload, validate_batch
+
+    season = catalog.calendar.resolve()
+    # The legacy path scans the whole table per call; keep large sizes bounded
+    legacy_n = max(5, min(iterations, 200000 // max(len(catalog), 1)))
+    scoring_n = max(5, min(iterations, 2000000 // max(len(catalog), 1)))
+    main.recommendation_cache.invalidate()
+    batch_payload = conditions[:1000]
+
+    return {
+        'recommend_crop.legacy_sql': time_calls(partial(legacy_recommend, db_path), conditions[:legacy_n]),
+        'recommend_crop': time_calls(main.recommend_crop, conditions[:iterations]),
+        'score_recommendations': time_calls(
+            lambda c: main.score_recommendations(catalog, c, season), conditions[:iterations]),
+        'score_recommendations.limit_5': time_calls(
+            lambda c: main.score_recommendations(catalog, c, season, limit=5), conditions[:iterations]),
+        'calculate_crop_score.all_crops': time_calls(
+            lambda c: [main.calculate_crop_score(crop, c, season) for crop in catalog.crops],
+            conditions[:scoring_n]),
+        'engine.score.all_crops': time_calls(
+            lambda c: catalog.engine.score_matrix(
+                c['temperature'], c['rainfall'], catalog.engine.soil_mask_for(c['soil_type']),
+                c['ph'], season.mask),
+            conditions[:iterations]),
+        'validate_input': time_calls(main.validate_input, conditions[:iterations]),
+        'validate_batch.1000_rows': time_calls(
+            lambda rows: validate_batch(*columns_from_payload(rows)), [batch_payload] * 20),
+    }
+
+def load_test(app, conditions, requests_total, concurrency):
+    """Drive a route from several threads; latency per request and overall throughput"""
+    def run(method, path, payloads):
+        latencies = []
+        lock = threading.Lock()
+        chunks = [payloads[i::concurrency] for i in range(concurrency)]
+
+        def worker(chunk):
+            client = app.test_client()
+            local = []
+            for payload in chunk:
+                start = time.perf_counter_ns()
+                if method == 'GET':
+                    response = client.get(path)
+                else:
+                    response = client.post(path, json=payload)
+                local.append(time.perf_counter_ns() - start)
+                if response.status_code >= 500:
+                    raise RuntimeError(f"{method} {path} returned {response.status_code}")
+            with lock:
+                latencies.extend(local)
+
+        threads = [threading.Thread(target=worker, args=(chunk,)) for chunk in chunks]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return summarize(latencies, time.perf_counter() - start)
+
+    payloads = (conditions * (requests_total // max(len(conditions), 1) + 1))[:requests_total]
+    return {
+        'POST /api/recommend': run('POST', '/api/recommend', payloads),
+        'GET /': run('GET', '/', [None] * requests_total),
+    }
+
+def peak_rss_kb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+def run_benchmarks(sizes, iterations, requests_total, concurrency, workdir):
+    import main
+    from catalog import reload_catalog
+
+    results = {}
+    for size in sizes:
+        db_path = os.path.join(workdir, f'crops_{size}.db')
+        start = time.perf_counter()
+        generate_catalog(db_path, size)
+        generated_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        # reload_catalog also builds the engine, index and calendar, so compile_s covers them
+        catalog = reload_catalog(db_path)
+        compiled_s = time.perf_counter() - start
+        assert len(catalog) == size, f"benchmarking {len(catalog)} crops instead of {size}"
+
+        conditions = random_conditions(max(iterations, 1000), seed=size)
+        results[str(size)] = {
+            'catalog': {'crops': len(catalog), 'generate_s': round(generated_s, 3),
+                        'compile_s': round(compiled_s, 3)},
+            'micro': micro_benchmarks(db_path, catalog, conditions, iterations),
+            'http': load_test(main.app, conditions, requests_total, concurrency),
+            'cache': main.recommendation_cache.stats(),
+            'peak_rss_kb': peak_rss_kb(),
+        }
+        print(f"Finished catalog size {size}", file=sys.stderr)
+    return results
+
+def compare(current, baseline, threshold):
+    """Metrics that got worse than the baseline by more than threshold (a fraction)"""
+    regressions = []
+    for size, sections in baseline.get('results', {}).items():
+        for section in ('micro', 'http'):
+            for name, old in sections.get(section, {}).items():
+                new = current['results'].get(size, {}).get(section, {}).get(name)
+                if not new:
+                    continue
+                if old['p95_us'] and new['p95_us'] > old['p95_us'] * (1 + threshold):
+                    regressions.append(f"{size}/{name}: p95 {old['p95_us']}us -> {new['p95_us']}us")
+                if old.get('ops_per_sec') and new['ops_per_sec'] < old['ops_per_sec'] * (1 - threshold):
+                    regressions.append(f"{size}/{name}: {old['ops_per_sec']} -> {new['ops_per_sec']} ops/s")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Crop recommendation benchmarks')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help='catalog sizes to generate (18 keeps the real catalog)')
+    parser.add_argument('--iterations', type=int, default=500, help='calls per micro-benchmark')
+    parser.add_argument('--requests', type=int, default=500, help='requests per HTTP route')
+    parser.add_argument('--concurrency', type=int, default=4, help='client threads for HTTP load')
+    parser.add_argument('--output', help='write JSON results here instead of stdout')
+    parser.add_argument('--compare', help='baseline JSON file to check for regressions')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='allowed slowdown relative to the baseline (0.25 = 25%%)')
+    args = parser.parse_args(argv)
+
+    # Per-request INFO logging would dominate the timings
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory(prefix='crop-bench-') as workdir:
+        report = {
+            'meta': {
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'platform': platform.platform(),
+                'iterations': args.iterations,
+                'requests': args.requests,
+                'concurrency': args.concurrency,
+            },
+            'results': run_benchmarks(args.sizes, args.iterations, args.requests,
+                                      args.concurrency, workdir),
+        }
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
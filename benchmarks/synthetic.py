@@ -0,0 +1,62 @@
+import sqlite3
+import json
+import random
+import crop_database_setup
+
+SOILS = ('clay', 'loam', 'sandy')
+SEASONS = ('Kharif', 'Rabi', 'Zaid')
+LEVELS = ('low', 'medium', 'high')
+
+def synthetic_crops(n_crops, seed=0):
+    """Rows in the crops table schema with plausible, randomly drawn ranges"""
+    rng = random.Random(seed)
+    for i in range(1, n_crops + 1):
+        t_min = round(rng.uniform(5, 30), 1)
+        r_min = round(rng.uniform(100, 2500), -1)
+        p_min = round(rng.uniform(4.5, 7.0), 1)
+        h_min = round(rng.uniform(30, 70))
+        yield (
+            i, f'Variety {i:06d}',
+            t_min, round(t_min + rng.uniform(5, 15), 1),
+            r_min, round(r_min + rng.uniform(200, 1500), -1),
+            p_min, round(p_min + rng.uniform(0.5, 2.0), 1),
+            h_min, min(100, h_min + round(rng.uniform(10, 30))),
+            ','.join(rng.sample(SEASONS, rng.randint(1, 2))),
+            ','.join(rng.sample(SOILS, rng.randint(1, 3))),
+            json.dumps({n: rng.choice(LEVELS) for n in ('nitrogen', 'phosphorus', 'potassium')}),
+        )
+
+def generate_catalog(path, n_crops, seed=0):
+    """Create a migrated crops database at path holding n_crops crops.
+
+    n_crops == 18 keeps the real seed catalog; any other size replaces it
+    with synthetic varieties.
+    """
+    crop_database_setup.migrate(path)
+    if n_crops == 18:
+        return path
+    conn = sqlite3.connect(path)
+    try:
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM crops')
+        cursor.executemany('''
+            INSERT INTO crops (id, name, temp_min, temp_max, rain_min, rain_max,
+                               ph_min, ph_max, humidity_min, humidity_max,
+                               seasons, soil_types, nutrients)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', synthetic_crops(n_crops, seed))
+        conn.commit()
+    finally:
+        conn.close()
+    return path
+
+def random_conditions(n, seed=0):
+    """Request payloads spread over the valid input ranges"""
+    rng = random.Random(seed)
+    return [{
+        'temperature': round(rng.uniform(5, 40), 1),
+        'rainfall': round(rng.uniform(100, 3000)),
+        'humidity': round(rng.uniform(30, 95)),
+        'ph': round(rng.uniform(4.5, 8.5), 1),
+        'soil_type': rng.choice(SOILS),
+    } for _ in range(n)]
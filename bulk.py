@@ -0,0 +1,170 @@
+"""Bulk scoring of plot files: python bulk.py plots.csv -o results.ndjson
+
+Input rows carry temperature, rainfall, humidity, ph and soil_type columns
+(plus optional plot_id and planting_date). Rows are read, validated and
+scored one chunk at a time, and results are streamed out as NDJSON or CSV,
+so memory stays bounded by the chunk size whatever the input size. Chunks
+shrink as the catalog grows, keeping rows x crops under CHUNK_CELLS.
+"""
+import argparse
+import csv
+import io
+import json
+import logging
+import os
+import sys
+import numpy as np
+from batch import FIELDS, validate_batch, score_batch
+from catalog import get_catalog
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNKSIZE = 10000
+# Largest rows x crops in one chunk
+CHUNK_CELLS = 10_000_000
+FORMATS = ('ndjson', 'csv')
+DATE_ERROR = "Planting date must be an ISO date (YYYY-MM-DD)"
+
+def chunk_rows(catalog, chunksize=DEFAULT_CHUNKSIZE):
+    """Rows per chunk: at most chunksize, and at most CHUNK_CELLS rows x crops"""
+    return max(1, min(chunksize, CHUNK_CELLS // max(len(catalog), 1)))
+
+def read_chunks(source, input_format='csv', chunksize=DEFAULT_CHUNKSIZE):
+    """Yield DataFrames of at most chunksize rows from a CSV or Parquet source"""
+    if input_format == 'parquet':
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Parquet input requires the pyarrow package")
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+        return
+    import pandas as pd
+    try:
+        # Keep values as text so validation sees exactly what the file contained
+        reader = pd.read_csv(source, chunksize=chunksize, dtype=str, keep_default_na=False)
+    except pd.errors.EmptyDataError:
+        return
+    with reader:
+        yield from reader
+
+def _column(frame, name):
+    if name not in frame.columns:
+        return [None] * len(frame)
+    values = frame[name].to_numpy(dtype=object, copy=True)
+    # Empty CSV cells count as missing, as an absent JSON field would
+    values[values == ''] = None
+    return values
+
+def _season_masks(month_masks, frame, default_mask):
+    """Season mask per row, and the rows whose planting_date is not YYYY-MM-DD"""
+    if 'planting_date' not in frame.columns:
+        return default_mask, ()
+    import pandas as pd
+    dates = pd.Series(_column(frame, 'planting_date'), index=frame.index)
+    months = pd.to_datetime(dates, format='%Y-%m-%d', errors='coerce').dt.month
+    parsed = months.notna().to_numpy()
+    # Rows without a date fall back to the job's season
+    invalid = np.flatnonzero(~parsed & dates.notna().to_numpy())
+    return np.where(parsed, month_masks[months.fillna(0).astype(int)], default_mask), invalid
+
+def score_chunk(engine, month_masks, frame, default_mask, start):
+    """Validate and score one chunk; yields one result dict per row"""
+    size = len(frame)
+    columns = {field: _column(frame, field) for field in FIELDS}
+    values, soils, errors = validate_batch(columns, size)
+    season_masks, invalid_dates = _season_masks(month_masks, frame, default_mask)
+    for i in invalid_dates:
+        errors[i].append(DATE_ERROR)
+    rankings = score_batch(engine, values, soils, season_masks)
+    ids = frame['plot_id'].tolist() if 'plot_id' in frame.columns else None
+    names = engine.names
+    for i in range(size):
+        result = {'row': start + i}
+        if ids is not None:
+            result['plot_id'] = ids[i]
+        if errors[i]:
+            result['errors'] = errors[i]
+        else:
+            crops, scores = rankings[i]
+            result['recommendations'] = [
+                {'crop': names[j], 'score': score} for j, score in zip(crops.tolist(), scores.tolist())
+            ]
+        yield result
+
+def encode_results(results, output_format='ndjson'):
+    """Result dicts as NDJSON lines or CSV rows (without the header)"""
+    if output_format == 'ndjson':
+        return ''.join(json.dumps(result) + '\n' for result in results)
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([
+        result['row'],
+        result.get('plot_id', ''),
+        ';'.join(f"{r['crop']}:{r['score']}" for r in result.get('recommendations', ())),
+        '; '.join(result.get('errors', ())),
+    ] for result in results)
+    return buffer.getvalue()
+
+def stream_results(chunks, planting_date=None, output_format='ndjson', workers=1):
+    """Encoded output, one string per input chunk, in input order.
+
+    With workers > 1 the chunks are scored on a process pool (see parallel.py).
+    """
+    catalog = get_catalog()
+    default_mask = catalog.calendar.resolve(planting_date).mask
+    if output_format == 'csv':
+        yield 'row,plot_id,recommendations,errors\r\n'
+    if workers > 1:
+        from parallel import score_parallel
+        yield from score_parallel(catalog, chunks, default_mask, output_format, workers)
+        return
+    engine = catalog.engine
+    month_masks = np.asarray(catalog.calendar.month_masks, dtype=np.int64)
+    start = 0
+    for frame in chunks:
+        yield encode_results(score_chunk(engine, month_masks, frame, default_mask, start), output_format)
+        start += len(frame)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Score a CSV or Parquet file of plots')
+    parser.add_argument('input', help="plot file, or '-' for CSV on stdin")
+    parser.add_argument('-o', '--output', help='output file (default: stdout)')
+    parser.add_argument('--input-format', choices=('csv', 'parquet'),
+                        help='defaults to parquet for .parquet files, csv otherwise')
+    parser.add_argument('--format', choices=FORMATS, default='ndjson', help='output format')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE,
+                        help='maximum rows per chunk')
+    parser.add_argument('--planting-date', help='ISO date used for rows without planting_date')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='score chunks on this many processes (0 = one per CPU)')
+    args = parser.parse_args(argv)
+
+    catalog = get_catalog()
+    try:
+        catalog.calendar.resolve(args.planting_date)
+    except ValueError:
+        logger.error("Planting date must be an ISO date (YYYY-MM-DD)")
+        return 1
+
+    input_format = args.input_format or ('parquet' if args.input.endswith('.parquet') else 'csv')
+    source = sys.stdin if args.input == '-' else args.input
+    out = sys.stdout
+    try:
+        if args.output:
+            out = open(args.output, 'w', newline='')
+        chunks = read_chunks(source, input_format, chunk_rows(catalog, args.chunksize))
+        workers = args.workers or os.cpu_count()
+        for piece in stream_results(chunks, args.planting_date, args.format, workers):
+            out.write(piece)
+    except (OSError, ValueError) as e:
+        # pandas' ParserError and pyarrow's ArrowInvalid are ValueErrors
+        logger.error(f"Bulk scoring failed: {str(e)}")
+        return 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+    sys.exit(main())
@@ -0,0 +1,323 @@
+import sqlite3
+import json
+import logging
+import os
+import threading
+from collections import namedtuple
+from collections.abc import Mapping, Sequence
+from datetime import datetime, timezone
+from functools import cached_property
+from types import MappingProxyType
+from crop_database_setup import DB_PATH, catalog_version
+from metrics import span
+
+logger = logging.getLogger(__name__)
+
+class _Record:
+    """Tuple record whose fields also read by name, e.g. crop['name']"""
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        return tuple.__getitem__(self, key)
+
+class Crop(_Record, namedtuple('Crop', [
+        'id', 'name', 'temp_range', 'rainfall_range', 'ph_range', 'humidity_range',
+        'soil_types', 'seasons', 'soils_text', 'seasons_text', 'nutrients', 'details'])):
+    """Immutable crop record with its display details formatted once"""
+    __slots__ = ()
+
+    @classmethod
+    def create(cls, nutrients_needed=None, **fields):
+        return cls(details=crop_details(fields, nutrients_needed), **fields)
+
+class GrowingSeason(_Record, namedtuple('GrowingSeason', ['name', 'start_month', 'end_month'])):
+    """Immutable row of the seasons table"""
+    __slots__ = ()
+
+def crop_details(crop, nutrients_needed=None):
+    """Display details shown for a recommended crop.
+
+    Built once per crop and shared by every response; treat as read-only.
+    Pass nutrients_needed to share one plain dict between crops with the
+    same nutrient profile.
+    """
+    name = crop['name']
+    t_min, t_max = crop['temp_range']
+    r_min, r_max = crop['rainfall_range']
+    if r_min > 1000:
+        water = 'High'
+    elif r_min > 500:
+        water = 'Medium'
+    else:
+        water = 'Low'
+    return {
+        'optimal_temp': f"{t_min}-{t_max}°C",
+        'optimal_rainfall': f"{r_min}-{r_max}mm",
+        'suitable_soil': crop['soils_text'],
+        'growing_season': crop['seasons_text'],
+        'nutrients_needed': dict(crop['nutrients']) if nutrients_needed is None else nutrients_needed,
+        'description': f"Detailed information about {name}",
+        'farming_practices': f"Standard farming practices for {name}",
+        'water_needs': water,
+        'sunlight_needs': 'Full Sun'
+    }
+
+class LazyCrops(Sequence):
+    """Crop records built on first access, e.g. from a mapped snapshot.
+
+    names and ids are known up front for the by_name and by_id lookups;
+    make(i) builds the record at position i.
+    """
+
+    def __init__(self, names, ids, make):
+        self.names = names
+        self.ids = ids
+        self._make = make
+        self._records = [None] * len(names)
+
+    def __len__(self):
+        return len(self._records)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return tuple(self[j] for j in range(*i.indices(len(self))))
+        record = self._records[i]
+        if record is None:
+            # Concurrent first accesses may both build it; the records are equal
+            record = self._records[i] = self._make(range(len(self))[i])
+        return record
+
+class _LazyLookup(Mapping):
+    """Read-only key -> crop mapping over positions in a LazyCrops"""
+
+    def __init__(self, keys, crops):
+        self._positions = {key: i for i, key in enumerate(keys)}
+        self._crops = crops
+
+    def __getitem__(self, key):
+        return self._crops[self._positions[key]]
+
+    def __contains__(self, key):
+        return key in self._positions
+
+    def __iter__(self):
+        return iter(self._positions)
+
+    def __len__(self):
+        return len(self._positions)
+
+class CropCatalog:
+    """Immutable, pre-parsed snapshot of the crops, soil_types and seasons tables"""
+
+    def __init__(self, crops, soil_types, seasons, engine=None, version=0):
+        self.soil_types = tuple(soil_types)
+        self.seasons = tuple(seasons)
+        if isinstance(crops, LazyCrops):
+            self.crops = crops
+            self.by_name = _LazyLookup(crops.names, crops)
+            self.by_id = _LazyLookup(crops.ids, crops)
+        else:
+            self.crops = tuple(crops)
+            self.by_name = MappingProxyType({crop['name']: crop for crop in self.crops})
+            self.by_id = MappingProxyType({crop['id']: crop for crop in self.crops})
+        self.built_at = datetime.now(timezone.utc).replace(microsecond=0)
+        # catalog_meta version the tables were read at (see catalog_watcher.py)
+        self.version = version
+        if engine is not None:
+            # Prime the cached property, e.g. with an engine over a mapped snapshot
+            self.__dict__['engine'] = engine
+
+    def __len__(self):
+        return len(self.crops)
+
+    @cached_property
+    def engine(self):
+        """Vectorized scoring engine over this catalog, built on first use"""
+        from scoring import ScoringEngine
+        return ScoringEngine(
+            self.crops,
+            soil_names=self.soil_types,
+            season_names=[season['name'] for season in self.seasons],
+        )
+
+    @cached_property
+    def calendar(self):
+        """Month to season lookup using the engine's season bits"""
+        from season_calendar import SeasonCalendar
+        return SeasonCalendar(self.seasons, self.engine.season_bits)
+
+    @cached_property
+    def index(self):
+        """Range and soil lookups over the engine's columns, built on first use"""
+        from interval_index import CatalogIndex
+        # From the engine's columns, so snapshot records stay unbuilt
+        return CatalogIndex(self.engine)
+
+    @cached_property
+    def breakpoints(self):
+        """(temperature, rainfall, pH) range bounds delimiting recommendation cells"""
+        from recommendation_cache import breakpoints
+        return tuple(breakpoints(self, field) for field in ('temp_range', 'rainfall_range', 'ph_range'))
+
+    @cached_property
+    def lookup(self):
+        """Precompiled LookupTable from CROP_LOOKUP_TABLE, or None to score live"""
+        path = os.environ.get('CROP_LOOKUP_TABLE')
+        if not path:
+            return None
+        from lookup_table import load_table
+        try:
+            return load_table(path, self)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring lookup table {path}: {str(e)}")
+            return None
+
+    def prime(self):
+        """Build the lazily derived structures now, off the request path; returns self"""
+        for name in ('engine', 'calendar', 'index', 'breakpoints', 'lookup'):
+            getattr(self, name)
+        return self
+
+    def candidates(self, temp, rainfall, soil_type):
+        """Crops whose temperature/rainfall ranges and soils admit the conditions.
+
+        Mirrors the former SQL prefilter in recommend_crop.
+        """
+        return [self.crops[i] for i in self.index.candidates(temp, rainfall, soil_type)]
+
+def _split(value):
+    return tuple(s.strip() for s in (value or '').split(',') if s.strip())
+
+def _shared(shared, key, make):
+    value = shared.get(key)
+    if value is None:
+        value = shared[key] = make()
+    return value
+
+def _profile(text):
+    profile = json.loads(text)
+    return MappingProxyType(profile), dict(profile)
+
+def _parse_crop(row, shared):
+    """Crop record for a crops row; values repeated across rows come from shared"""
+    (crop_id, name, t_min, t_max, r_min, r_max, p_min, p_max,
+     h_min, h_max, seasons, soils, nutrients) = row
+    nutrients, needed = _shared(shared, ('nutrients', nutrients), lambda: _profile(nutrients))
+    soils = _shared(shared, ('text', soils), lambda: soils)
+    seasons = _shared(shared, ('text', seasons), lambda: seasons)
+    return Crop.create(
+        id=crop_id,
+        name=name,
+        temp_range=(float(t_min), float(t_max)),
+        rainfall_range=(float(r_min), float(r_max)),
+        ph_range=(float(p_min), float(p_max)),
+        humidity_range=(float(h_min), float(h_max)),
+        soil_types=_shared(shared, ('set', soils), lambda: frozenset(_split(soils))),
+        seasons=_shared(shared, ('set', seasons), lambda: frozenset(_split(seasons))),
+        soils_text=soils,
+        seasons_text=seasons,
+        nutrients=nutrients,
+        nutrients_needed=needed,
+    )
+
+def build_catalog(db_path=DB_PATH):
+    """Read the reference tables once and compile them into a CropCatalog"""
+    conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True, isolation_level=None)
+    try:
+        cursor = conn.cursor()
+        # One read transaction so the version matches the rows read
+        cursor.execute('BEGIN')
+        version = catalog_version(cursor)
+        with span('sql_execute'):
+            rows = cursor.execute('''
+                SELECT id, name, temp_min, temp_max, rain_min, rain_max,
+                       ph_min, ph_max, humidity_min, humidity_max,
+                       seasons, soil_types, nutrients
+                FROM crops
+                ORDER BY id
+            ''').fetchall()
+        crops = []
+        shared = {}
+        with span('row_parse'):
+            for row in rows:
+                try:
+                    crops.append(_parse_crop(row, shared))
+                except (TypeError, ValueError, json.JSONDecodeError) as e:
+                    logger.error(f"Error processing crop {row[1]}: {str(e)}")
+
+        cursor.execute('SELECT name FROM soil_types ORDER BY id')
+        soil_types = [row[0].lower() for row in cursor.fetchall()]
+
+        cursor.execute('SELECT name, start_month, end_month FROM seasons ORDER BY id')
+        seasons = [GrowingSeason(*row) for row in cursor.fetchall()]
+        cursor.execute('COMMIT')
+    finally:
+        conn.close()
+
+    logger.info(f"Compiled crop catalog version {version} with {len(crops)} crops")
+    return CropCatalog(crops, soil_types, seasons, version=version)
+
+def load_catalog(db_path=DB_PATH):
+    """Catalog from the CROP_CATALOG_SNAPSHOT file when set and fresh, else from SQLite"""
+    snapshot = os.environ.get('CROP_CATALOG_SNAPSHOT')
+    if snapshot:
+        from catalog_snapshot import load_snapshot
+        try:
+            return load_snapshot(snapshot, db_path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring catalog snapshot {snapshot}: {str(e)}")
+    return build_catalog(db_path)
+
+_catalog = None
+# Database the active catalog was read from; versions only compare within one
+_catalog_path = None
+_catalog_lock = threading.Lock()
+_listeners = []
+
+def on_swap(callback):
+    """Call callback(catalog) whenever reload_catalog swaps in a new catalog"""
+    _listeners.append(callback)
+
+def get_catalog():
+    """Return the active catalog, compiling it on first use"""
+    catalog = _catalog
+    if catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _swap(load_catalog().prime(), DB_PATH)
+            catalog = _catalog
+    return catalog
+
+def reload_catalog(db_path=DB_PATH):
+    """Rebuild the catalog from the database and swap it in atomically.
+
+    The new catalog is fully built before the swap, so the first requests
+    on it do not pay for its engine or index. Readers holding the previous
+    catalog keep using it until they finish. Returns the active catalog,
+    which stays the current one if a concurrent reload of the same
+    database already swapped in a newer version. A catalog from another
+    database is always swapped in.
+    """
+    catalog = load_catalog(db_path).prime()
+    with _catalog_lock:
+        current = _catalog
+        if current is not None and db_path == _catalog_path and catalog.version < current.version:
+            logger.info(f"Discarding catalog version {catalog.version}, "
+                        f"version {current.version} is already active")
+            return current
+        _swap(catalog, db_path)
+    for callback in _listeners:
+        try:
+            callback(catalog)
+        except Exception as e:
+            logger.error(f"Catalog swap listener failed: {str(e)}")
+    return catalog
+
+def _swap(catalog, db_path):
+    global _catalog, _catalog_path
+    _catalog, _catalog_path = catalog, db_path
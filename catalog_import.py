@@ -0,0 +1,209 @@
+"""Bulk catalog import: python catalog_import.py --crops varieties.csv [--soils ...] [--seasons ...]
+
+Loads crop, soil type and season rows from CSV or JSON files (a list of
+objects) and upserts them by name in one transaction: rows are validated
+up front and written with executemany. Columns not present in a file, and
+blank values, keep their current values on existing rows; new crops must give every column build_catalog needs. The catalog
+version is bumped once per import rather than by the per-row triggers.
+"""
+import argparse
+import csv
+import json
+import logging
+import sqlite3
+import sys
+import time
+from crop_database_setup import (DB_PATH, bump_catalog_version, create_version_triggers,
+                                 drop_version_triggers)
+
+logger = logging.getLogger(__name__)
+
+# Importable columns per table: (all columns, numeric columns, JSON columns)
+TABLES = {
+    'soil_types': (
+        ('name', 'description', 'texture', 'drainage', 'water_retention', 'nutrient_retention',
+         'ph_min', 'ph_max', 'organic_matter', 'suitable_crops', 'management_practices',
+         'characteristics'),
+        ('ph_min', 'ph_max'),
+        ('characteristics',),
+    ),
+    'seasons': (
+        ('name', 'start_month', 'end_month', 'characteristics', 'suitable_crops',
+         'rainfall_pattern', 'temperature_range', 'humidity_range', 'daylight_hours',
+         'wind_pattern', 'farming_activities'),
+        ('start_month', 'end_month'),
+        ('farming_activities',),
+    ),
+    'crops': (
+        ('name', 'temp_min', 'temp_max', 'rain_min', 'rain_max', 'ph_min', 'ph_max',
+         'humidity_min', 'humidity_max', 'seasons', 'soil_types', 'nutrients'),
+        ('temp_min', 'temp_max', 'rain_min', 'rain_max', 'ph_min', 'ph_max',
+         'humidity_min', 'humidity_max'),
+        ('nutrients',),
+    ),
+}
+# Columns a new row must have; build_catalog skips crops lacking any of them
+REQUIRED = {
+    'crops': ('temp_min', 'temp_max', 'rain_min', 'rain_max', 'ph_min', 'ph_max',
+              'humidity_min', 'humidity_max', 'seasons', 'soil_types', 'nutrients'),
+}
+# Whole-number columns and their allowed (low, high) per table
+BOUNDED = {
+    'seasons': {'start_month': (1, 12), 'end_month': (1, 12)},
+}
+# Import order: crops link to the soil types and seasons loaded before them
+ORDER = ('soil_types', 'seasons', 'crops')
+# Per-connection settings for the import; WAL keeps readers unblocked
+IMPORT_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA cache_size=-65536',
+    'PRAGMA temp_store=MEMORY',
+)
+
+def read_rows(path):
+    """Row dicts from a CSV file or a JSON list of objects"""
+    if path.endswith('.json'):
+        with open(path) as f:
+            rows = json.load(f)
+        if not isinstance(rows, list):
+            raise ValueError(f"{path} must contain a JSON list of objects")
+        return rows
+    with open(path, newline='') as f:
+        return list(csv.DictReader(f))
+
+def prepare(table, rows, existing=()):
+    """Validated parameter tuples for the columns present; returns (columns, params, errors).
+
+    Rows whose name is not in existing are new and need the REQUIRED columns.
+    """
+    known, numeric, json_columns = TABLES[table]
+    present = set()
+    for row in rows:
+        present.update(row)
+    if 'name' not in present:
+        raise ValueError(f"{table} rows need a 'name' column")
+    columns = [c for c in known if c in present]
+    unknown = present - set(known) - {'id'}
+    if unknown:
+        logger.warning(f"Ignoring unknown {table} columns: {', '.join(sorted(unknown))}")
+
+    bounded = BOUNDED.get(table, {})
+    params, errors = [], []
+    for i, row in enumerate(rows):
+        try:
+            values = tuple(_value(row.get(c), c in numeric, c in json_columns) for c in columns)
+            named = dict(zip(columns, values))
+            _check(named, () if named['name'] in existing else REQUIRED.get(table, ()), bounded)
+        except (TypeError, ValueError) as e:
+            errors.append(f"{table} row {i + 1} ({row.get('name')}): {str(e)}")
+            continue
+        params.append(tuple(int(v) if c in bounded and v is not None else v
+                            for c, v in named.items()))
+    return columns, params, errors
+
+def _check(values, required, bounded):
+    if not values['name']:
+        raise ValueError("name is required")
+    missing = [c for c in required if values.get(c) is None]
+    if missing:
+        raise ValueError(f"new rows need {', '.join(missing)}")
+    for c, (low, high) in bounded.items():
+        value = values.get(c)
+        if value is not None and not (value.is_integer() and low <= value <= high):
+            raise ValueError(f"{c} must be a whole number from {low} to {high}")
+    for low in (c for c in values if c.endswith('_min')):
+        high = low[:-4] + '_max'
+        if values[low] is not None and values.get(high) is not None and values[low] > values[high]:
+            raise ValueError(f"{low} > {high}")
+
+def _value(value, numeric, is_json):
+    if value is None or value == '':
+        return None
+    if numeric:
+        return float(value)
+    if is_json:
+        # Normalize JSON text and accept objects straight from JSON input
+        return json.dumps(json.loads(value) if isinstance(value, str) else value)
+    return str(value).strip()
+
+def upsert_sql(table, columns):
+    # Blank values leave the stored column as it is
+    updates = ', '.join(f'{c} = COALESCE(excluded.{c}, {c})' for c in columns if c != 'name')
+    conflict = f'DO UPDATE SET {updates}' if updates else 'DO NOTHING'
+    return (f"INSERT INTO {table} ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' for _ in columns)}) ON CONFLICT(name) {conflict}")
+
+def import_catalog(sources, db_path=DB_PATH):
+    """Upsert {table: path} sources in one transaction and return a report dict"""
+    started = time.perf_counter()
+    report = {'tables': {}, 'errors': []}
+    loaded = {}
+    for table in ORDER:
+        if table in sources:
+            t0 = time.perf_counter()
+            loaded[table] = (read_rows(sources[table]), time.perf_counter() - t0)
+
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        for pragma in IMPORT_PRAGMAS:
+            conn.execute(pragma)
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            drop_version_triggers(cursor)
+            for table, (rows, read_s) in loaded.items():
+                t0 = time.perf_counter()
+                existing = {name for name, in cursor.execute(f'SELECT name FROM {table}')}
+                columns, params, errors = prepare(table, rows, existing)
+                report['errors'] += errors
+                stats = report['tables'][table] = {
+                    'read': len(rows), 'skipped': len(errors),
+                    'parse_s': round(read_s + time.perf_counter() - t0, 3)}
+                t0 = time.perf_counter()
+                names = {p[columns.index('name')] for p in params}
+                cursor.executemany(upsert_sql(table, columns), params)
+                stats['updated'] = len(names & existing)
+                stats['inserted'] = len(names - existing)
+                stats['write_s'] = round(time.perf_counter() - t0, 3)
+            create_version_triggers(cursor)
+            bump_catalog_version(cursor)
+            cursor.execute('COMMIT')
+        except Exception:
+            cursor.execute('ROLLBACK')
+            raise
+    finally:
+        conn.close()
+    report['total_s'] = round(time.perf_counter() - started, 3)
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Bulk import crop, soil type and season catalogs')
+    parser.add_argument('--crops', help='CSV or JSON file of crops')
+    parser.add_argument('--soils', help='CSV or JSON file of soil types')
+    parser.add_argument('--seasons', help='CSV or JSON file of seasons')
+    parser.add_argument('--db', default=DB_PATH, help='database to import into')
+    args = parser.parse_args(argv)
+
+    sources = {table: path for table, path in
+               (('crops', args.crops), ('soil_types', args.soils), ('seasons', args.seasons)) if path}
+    if not sources:
+        parser.error('give at least one of --crops, --soils, --seasons')
+
+    try:
+        report = import_catalog(sources, args.db)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        logger.error(f"Import failed, nothing was written: {str(e)}")
+        return 1
+    for error in report['errors']:
+        logger.warning(f"Skipped {error}")
+    for table, stats in report['tables'].items():
+        print(f"{table}: {stats['read']} read, {stats['inserted']} inserted, "
+              f"{stats['updated']} updated, {stats['skipped']} skipped "
+              f"(parse {stats['parse_s']}s, write {stats['write_s']}s)")
+    print(f"Total {report['total_s']}s")
+    return 0
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -0,0 +1,267 @@
+"""Binary catalog snapshot: python catalog_snapshot.py build [--db crops.db] [-o crops.catalog]
+
+The snapshot holds the compiled catalog as fixed-width little-endian
+arrays: the scoring engine's range and bitmask columns, crop ids,
+nutrient levels interned as uint8 codes, and a string table for names
+and display text. Workers map the file read-only and point NumPy at it
+with frombuffer, so every process shares the same physical pages and
+nothing is parsed from SQLite at startup. Only the crop names and ids
+are decoded at load; a crop's record and display details are built from
+the mapped arrays the first time a response needs them.
+
+Layout: MAGIC, a uint64 header length, a JSON header, then the arrays,
+each 64-byte aligned at the offsets recorded in the header.
+"""
+import argparse
+import json
+import logging
+import mmap
+import os
+import sqlite3
+import sys
+from types import MappingProxyType
+import numpy as np
+from crop_database_setup import DB_PATH, catalog_version
+from scoring import ARRAYS, ScoringEngine
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'CROPCAT\x01'
+SNAPSHOT_PATH = 'crops.catalog'
+ALIGN = 64
+# Nutrient code for a crop that does not list that nutrient
+NO_LEVEL = 255
+# Strings stored per crop in the string table, in this order
+STRING_FIELDS = ('name', 'soils_text', 'seasons_text')
+
+def _align(offset):
+    return -(-offset // ALIGN) * ALIGN
+
+def source_stamp(db_path):
+    """Modification stamp of the database (and a non-empty WAL) for staleness checks"""
+    st = os.stat(db_path)
+    stamp = [st.st_mtime_ns, st.st_size]
+    try:
+        wal = os.stat(f'{db_path}-wal')
+    except FileNotFoundError:
+        wal = None
+    if wal is not None and wal.st_size:
+        stamp += [wal.st_mtime_ns, wal.st_size]
+    return stamp
+
+def _string_table(crops):
+    encoded = [(crop[field] or '').encode('utf-8') for crop in crops for field in STRING_FIELDS]
+    offsets = np.zeros(len(encoded) + 1, dtype='<i8')
+    np.cumsum([len(s) for s in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+def write_snapshot(catalog, path=SNAPSHOT_PATH, db_path=DB_PATH, stamp=None):
+    """Write a compiled catalog to path atomically; returns the number of crops.
+
+    stamp is source_stamp(db_path) taken before the catalog was read, so a
+    write landing while it was compiled leaves the snapshot stale rather
+    than stamped as fresh; build_snapshot takes care of that.
+    """
+    crops = catalog.crops
+    engine = catalog.engine
+    keys = sorted({key for crop in crops for key in crop['nutrients']})
+    levels = sorted({json.dumps(v) for crop in crops for v in crop['nutrients'].values()})
+    if len(levels) >= NO_LEVEL:
+        raise ValueError(f"Too many distinct nutrient levels for uint8 codes: {len(levels)}")
+    level_codes = {level: i for i, level in enumerate(levels)}
+    nutrients = np.full((len(crops), len(keys)), NO_LEVEL, dtype=np.uint8)
+    for i, crop in enumerate(crops):
+        for j, key in enumerate(keys):
+            if key in crop['nutrients']:
+                nutrients[i, j] = level_codes[json.dumps(crop['nutrients'][key])]
+    string_offsets, string_data = _string_table(crops)
+
+    arrays = {name: getattr(engine, name).astype(getattr(engine, name).dtype.newbyteorder('<'))
+              for name in ARRAYS}
+    arrays['id'] = np.array([crop['id'] for crop in crops], dtype='<i8')
+    arrays['nutrients'] = nutrients
+    arrays['string_offsets'] = string_offsets
+    arrays['string_data'] = string_data
+
+    write_arrays(path, MAGIC, {
+        'crops': len(crops),
+        'version': catalog.version,
+        'source': {'path': os.path.realpath(db_path),
+                   'stamp': source_stamp(db_path) if stamp is None else stamp},
+        'soil_types': list(catalog.soil_types),
+        'seasons': [season._asdict() for season in catalog.seasons],
+        'soil_bits': engine.soil_bits,
+        'season_bits': engine.season_bits,
+        'nutrient_keys': keys,
+        'nutrient_levels': levels,
+    }, arrays)
+    return len(crops)
+
+def build_snapshot(db_path=DB_PATH, path=SNAPSHOT_PATH):
+    """Compile the database and write its snapshot; returns the number of crops"""
+    from catalog import build_catalog
+    stamp = source_stamp(db_path)
+    return write_snapshot(build_catalog(db_path), path, db_path, stamp)
+
+def write_arrays(path, magic, header, arrays):
+    """Write magic, a JSON header and the named arrays to path atomically.
+
+    The array layout is added to the header under 'arrays'.
+    """
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = [offset, array.dtype.str, list(array.shape)]
+        offset = _align(offset + array.nbytes)
+    header = json.dumps(dict(header, arrays=layout)).encode('utf-8')
+
+    data_start = _align(len(magic) + 8 + len(header))
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(magic)
+        f.write(len(header).to_bytes(8, 'little'))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name][0])
+            f.write(np.ascontiguousarray(array).tobytes())
+    os.replace(tmp_path, path)
+
+def read_header(path, magic):
+    """Header of a file written by write_arrays, without mapping its arrays"""
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return _read_header(mm, magic)[0]
+
+def map_arrays(path, magic):
+    """(header, arrays) of a file written by write_arrays.
+
+    The arrays are read-only views of one shared mapping of the file.
+    """
+    with open(path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    header, data_start = _read_header(mm, magic)
+    arrays = {}
+    for name, (offset, dtype, shape) in header['arrays'].items():
+        count = int(np.prod(shape))
+        arrays[name] = np.frombuffer(
+            mm, dtype=dtype, count=count, offset=data_start + offset).reshape(shape)
+    return header, arrays
+
+def _read_header(mm, magic):
+    if mm[:len(magic)] != magic:
+        raise ValueError("Unrecognized file format")
+    start = len(magic) + 8
+    length = int.from_bytes(mm[len(magic):start], 'little')
+    return json.loads(mm[start:start + length]), _align(start + length)
+
+def load_snapshot(path=SNAPSHOT_PATH, db_path=DB_PATH):
+    """Map a snapshot and build a CropCatalog over it, with records built on access.
+
+    Raises ValueError when the file is not a snapshot or was built from a
+    different or since-modified database, or from another catalog version.
+    """
+    from catalog import Crop, CropCatalog, GrowingSeason, LazyCrops
+
+    header, arrays = map_arrays(path, MAGIC)
+    source = header['source']
+    if source['path'] != os.path.realpath(db_path) or source['stamp'] != source_stamp(db_path):
+        raise ValueError(f"Snapshot {path} is stale for {db_path}")
+    version = _database_version(db_path)
+    if header.get('version') != version:
+        raise ValueError(f"Snapshot {path} holds catalog version {header.get('version')}, "
+                         f"{db_path} is at version {version}")
+
+    n = header['crops']
+    data = arrays['string_data']
+    bounds = arrays['string_offsets']
+    width = len(STRING_FIELDS)
+    # Names are stored first of each crop's strings; decode just those now
+    starts, ends = bounds[0:-1:width].tolist(), bounds[1::width].tolist()
+    raw = data.tobytes()
+    names = [raw[a:b].decode('utf-8') for a, b in zip(starts, ends)]
+    del raw
+
+    def string(k):
+        return data[bounds[k]:bounds[k + 1]].tobytes().decode('utf-8')
+
+    soil_sets = _mask_sets(header['soil_bits'])
+    season_sets = _mask_sets(header['season_bits'])
+    keys = header['nutrient_keys']
+    levels = [json.loads(level) for level in header['nutrient_levels']]
+    columns = {name: arrays[name] for name in ARRAYS}
+    nutrient_codes = arrays['nutrients']
+    # Crops share a handful of nutrient profiles and texts; build each once
+    profiles = {}
+    texts = {}
+
+    def make(i):
+        codes = nutrient_codes[i].tobytes()
+        if codes not in profiles:
+            profile = {key: levels[code] for key, code in zip(keys, codes) if code != NO_LEVEL}
+            profiles[codes] = (MappingProxyType(profile), dict(profile))
+        nutrients, needed = profiles[codes]
+        soils_text, seasons_text = string(width * i + 1), string(width * i + 2)
+        value = {name: column[i].item() for name, column in columns.items()}
+        return Crop.create(
+            id=ids[i],
+            name=names[i],
+            temp_range=(value['temp_min'], value['temp_max']),
+            rainfall_range=(value['rain_min'], value['rain_max']),
+            ph_range=(value['ph_min'], value['ph_max']),
+            humidity_range=(value['humidity_min'], value['humidity_max']),
+            soil_types=soil_sets(value['soil_mask']),
+            seasons=season_sets(value['season_mask']),
+            soils_text=texts.setdefault(soils_text, soils_text),
+            seasons_text=texts.setdefault(seasons_text, seasons_text),
+            nutrients=nutrients,
+            nutrients_needed=needed,
+        )
+
+    ids = arrays['id'].tolist()
+    engine = ScoringEngine.from_arrays(
+        names, {name: arrays[name] for name in ARRAYS},
+        header['soil_bits'], header['season_bits'])
+    seasons = [GrowingSeason(**season) for season in header['seasons']]
+    logger.info(f"Loaded crop catalog snapshot {path} with {n} crops")
+    return CropCatalog(LazyCrops(names, ids, make), header['soil_types'], seasons,
+                       engine=engine, version=version)
+
+def _database_version(db_path):
+    conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+    try:
+        return catalog_version(conn.cursor())
+    except sqlite3.Error as e:
+        raise ValueError(f"Cannot read the catalog version of {db_path}: {str(e)}")
+    finally:
+        conn.close()
+
+def _mask_sets(bits):
+    """Callable mapping a bitmask to the frozenset of its names, memoized per mask"""
+    cache = {}
+
+    def names(mask):
+        result = cache.get(mask)
+        if result is None:
+            result = cache[mask] = frozenset(name for name, bit in bits.items() if mask & bit)
+        return result
+    return names
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build or inspect the binary crop catalog snapshot')
+    parser.add_argument('command', nargs='?', default='build', choices=('build', 'info'))
+    parser.add_argument('--db', default=DB_PATH, help='source database')
+    parser.add_argument('-o', '--output', default=SNAPSHOT_PATH, help='snapshot file')
+    args = parser.parse_args(argv)
+
+    if args.command == 'info':
+        header = read_header(args.output, MAGIC)
+        fresh = header['source']['stamp'] == source_stamp(header['source']['path'])
+        print(f"{header['crops']} crops from {header['source']['path']} ({'fresh' if fresh else 'stale'})")
+        return 0
+
+    count = build_snapshot(args.db, args.output)
+    print(f"Wrote {count} crops to {args.output}")
+    return 0
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
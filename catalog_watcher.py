@@ -0,0 +1,87 @@
+"""Hot reload of the crop catalog when the database changes.
+
+Every write to the catalog tables bumps catalog_meta.version (triggers
+added by migration 2). A daemon thread polls PRAGMA data_version on its
+own read-only connection, which only changes when another connection
+commits, and reads the version only then. When it moved, the catalog is
+rebuilt on the watcher thread and swapped in atomically; requests keep
+using the previous catalog until the swap, so nothing waits on a reload.
+"""
+import logging
+import sqlite3
+import threading
+import time
+from catalog import get_catalog, reload_catalog
+from crop_database_setup import DB_PATH, catalog_version
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+class CatalogWatcher:
+    """Polls the database every interval seconds and reloads the catalog on change"""
+
+    def __init__(self, db_path=DB_PATH, interval=5.0):
+        self.db_path = db_path
+        self.interval = interval
+        self.reloads = 0
+        self.failures = 0
+        self._conn = None
+        self._data_version = None
+        self._version = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        # Changes are measured from the catalog the worker is serving now
+        self._version = get_catalog().version
+        self._thread = threading.Thread(target=self._run, name='catalog-watcher', daemon=True)
+        self._thread.start()
+        logger.info(f"Watching {self.db_path} for catalog changes every {self.interval}s")
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def check(self):
+        """Poll once; reload and return True when the catalog version changed"""
+        with self._lock:
+            return self._check()
+
+    def _check(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(
+                f'file:{self.db_path}?mode=ro', uri=True, check_same_thread=False)
+        cursor = self._conn.cursor()
+        data_version = cursor.execute('PRAGMA data_version').fetchone()[0]
+        if data_version == self._data_version:
+            return False
+        version = catalog_version(cursor)
+        if version == self._version:
+            self._data_version = data_version
+            return False
+
+        start = time.perf_counter()
+        catalog = reload_catalog(self.db_path)
+        elapsed = time.perf_counter() - start
+        self._version = catalog.version
+        self._data_version = data_version
+        self.reloads += 1
+        registry.histogram('crop_catalog_reload_seconds', 'Catalog rebuild time on hot reload').observe(elapsed)
+        logger.info(f"Reloaded crop catalog version {catalog.version} "
+                    f"({len(catalog)} crops) in {elapsed:.2f}s")
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                # Keep serving the current catalog and try again next interval
+                self.failures += 1
+                logger.error(f"Catalog reload failed: {str(e)}")
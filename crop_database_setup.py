@@ -5,12 +5,17 @@ import os
 
 logger = logging.getLogger(__name__)
 
-def init_db():
-    """Initialize all tables in crops database"""
-    db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'crops.db')
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
+# Absolute path of the SQLite database shared by the app and the setup tools
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'crops.db')
+
+# Bump together with a new entry in MIGRATIONS
+SCHEMA_VERSION = 2
+
+# Tables whose contents are compiled into the in-memory crop catalog
+CATALOG_TABLES = ('crops', 'soil_types', 'seasons')
+
+def create_base_schema(cursor):
+    """Migration 1: create the crops, soil_types and seasons tables and seed them"""
     # Create all tables
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS crops (
@@ -104,18 +109,14 @@ def init_db():
          }))
     ]
     
-    for soil in soil_types_data:
-        try:
-            cursor.execute('''
-            INSERT OR IGNORE INTO soil_types (
-                id, name, description, texture, drainage,
-                water_retention, nutrient_retention, ph_min, ph_max,
-                organic_matter, suitable_crops, management_practices, characteristics
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', soil)
-        except sqlite3.IntegrityError:
-            logger.warning(f"Soil type '{soil[1]}' already exists, skipping...")
+    cursor.executemany('''
+        INSERT OR IGNORE INTO soil_types (
+            id, name, description, texture, drainage,
+            water_retention, nutrient_retention, ph_min, ph_max,
+            organic_matter, suitable_crops, management_practices, characteristics
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', soil_types_data)
 
     # Insert season data
     seasons_data = [
@@ -180,20 +181,16 @@ def init_db():
          }))
     ]
     
-    for season in seasons_data:
-        try:
-            cursor.execute('''
-            INSERT OR IGNORE INTO seasons (
-                id, name, start_month, end_month,
-                characteristics, suitable_crops,
-                rainfall_pattern, temperature_range,
-                humidity_range, daylight_hours,
-                wind_pattern, farming_activities
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', season)
-        except sqlite3.IntegrityError:
-            logger.warning(f"Season '{season[1]}' already exists, skipping...")
+    cursor.executemany('''
+        INSERT OR IGNORE INTO seasons (
+            id, name, start_month, end_month,
+            characteristics, suitable_crops,
+            rainfall_pattern, temperature_range,
+            humidity_range, daylight_hours,
+            wind_pattern, farming_activities
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', seasons_data)
 
     # Insert crop data
     crops_data = [
@@ -217,22 +214,127 @@ def init_db():
         (18, 'Black Pepper', 20, 35, 2000, 3000, 5.5, 6.5, 65, 95, 'Kharif', 'loam', json.dumps({"nitrogen": "high", "phosphorus": "medium", "potassium": "high"}))
     ]
     
-    for crop in crops_data:
+    cursor.executemany('''
+        INSERT OR IGNORE INTO crops (id, name, temp_min, temp_max, rain_min, rain_max, 
+                          ph_min, ph_max, humidity_min, humidity_max, 
+                          seasons, soil_types, nutrients)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', crops_data)
+
+def add_catalog_version(cursor):
+    """Migration 2: a catalog version counter bumped by triggers on every write.
+
+    Workers poll it (see catalog_watcher.py) to reload the compiled catalog
+    without a restart.
+    """
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS catalog_meta (
+        key TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    )
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO catalog_meta (key, value) VALUES ('version', 1)")
+    create_version_triggers(cursor)
+
+# (table, event) pairs with a bump_catalog_version trigger
+VERSION_TRIGGERS = tuple((table, event) for table in CATALOG_TABLES
+                         for event in ('INSERT', 'UPDATE', 'DELETE'))
+
+def create_version_triggers(cursor):
+    """Triggers that bump the catalog version on every row written"""
+    for table, event in VERSION_TRIGGERS:
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS bump_catalog_version_{table}_{event.lower()}
+        AFTER {event} ON {table}
+        BEGIN
+            UPDATE catalog_meta SET value = value + 1 WHERE key = 'version';
+        END
+        ''')
+
+def drop_version_triggers(cursor):
+    """Drop the version triggers, e.g. for a bulk write that bumps the version once"""
+    for table, event in VERSION_TRIGGERS:
+        cursor.execute(f'DROP TRIGGER IF EXISTS bump_catalog_version_{table}_{event.lower()}')
+
+def bump_catalog_version(cursor):
+    cursor.execute("UPDATE catalog_meta SET value = value + 1 WHERE key = 'version'")
+
+# (version, step) pairs applied in order by migrate()
+MIGRATIONS = (
+    (1, create_base_schema),
+    (2, add_catalog_version),
+)
+
+def migrate(db_path=DB_PATH):
+    """Apply pending migrations in a single transaction and return the schema version"""
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        # WAL lets catalog readers proceed while a writer holds the database
+        conn.execute('PRAGMA journal_mode=WAL')
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
         try:
-            cursor.execute('''
-            INSERT OR IGNORE INTO crops (id, name, temp_min, temp_max, rain_min, rain_max, 
-                              ph_min, ph_max, humidity_min, humidity_max, 
-                              seasons, soil_types, nutrients)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', crop)
-        except sqlite3.IntegrityError:
-            logger.warning(f"Crop '{crop[1]}' already exists, skipping...")
-    
-    conn.commit()
-    conn.close()
+            version = cursor.execute('PRAGMA user_version').fetchone()[0]
+            pending = [(v, step) for v, step in MIGRATIONS if v > version]
+            for v, step in pending:
+                logger.info(f"Applying migration {v}: {step.__name__}")
+                step(cursor)
+            if pending:
+                version = pending[-1][0]
+                cursor.execute(f'PRAGMA user_version = {version:d}')
+            cursor.execute('COMMIT')
+        except Exception:
+            cursor.execute('ROLLBACK')
+            raise
+    finally:
+        conn.close()
+    logger.info(f"Database schema is at version {version}")
+    return version
+
+def schema_version(db_path=DB_PATH):
+    """Read the schema version through a read-only connection"""
+    conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+    try:
+        return conn.execute('PRAGMA user_version').fetchone()[0]
+    finally:
+        conn.close()
+
+def verify_schema(db_path=DB_PATH):
+    """Check, without writing, that the database has been migrated"""
+    try:
+        version = schema_version(db_path)
+    except sqlite3.Error as e:
+        logger.error(f"Cannot open database {db_path}: {e}")
+        return False
+    if version < SCHEMA_VERSION:
+        logger.error(f"Database schema version {version} is older than {SCHEMA_VERSION}; "
+                     f"run `python crop_database_setup.py migrate`")
+        return False
+    return True
+
+def catalog_version(cursor):
+    """Current catalog version, bumped by every write to the catalog tables"""
+    row = cursor.execute("SELECT value FROM catalog_meta WHERE key = 'version'").fetchone()
+    return row[0] if row else 0
+
+def init_db():
+    """Initialize all tables in crops database"""
+    try:
+        migrate()
+    except sqlite3.Error as e:
+        logger.error(f"Database migration failed: {e}")
+        return False
     logger.info("All database tables initialized successfully")
     return True
 
 if __name__ == '__main__':
+    import argparse
     logging.basicConfig(level=logging.INFO)
-    init_db()
+    parser = argparse.ArgumentParser(description='Manage the crops database schema')
+    parser.add_argument('command', nargs='?', default='migrate', choices=['migrate', 'version'],
+                        help='apply pending migrations (default) or print the schema version')
+    args = parser.parse_args()
+    if args.command == 'version':
+        print(f"{schema_version()} (expected {SCHEMA_VERSION})")
+    else:
+        init_db()
@@ -1,6 +1,6 @@
 import sqlite3
 from models import db, Crop, SoilType, Season
-from app_factory import create_app
+from app_factory import create_app, init_models
 import json
 import logging
 from crop_database_setup import init_db as setup_db  
@@ -58,7 +58,6 @@ def init_from_db():
                     'soil_types': soils.split(','),
                     'nutrients': json.loads(nutrients)
                 }
-                logger.info(f"Successfully loaded crop data for: {name}")
 
             except (ValueError, json.JSONDecodeError) as e:
                 logger.error(f"Error processing crop {name}: {str(e)}")
@@ -91,6 +90,7 @@ def init_soil_types():
             logger.warning("No soil types found in database!")
             return False
             
+        soils = []
         for soil in soils_data:
             try:
                 soil_data = {
@@ -105,13 +105,14 @@ def init_soil_types():
                     'suitable_crops': soil[9],
                     'management_practices': soil[10]
                 }
-                soil_type = SoilType(**soil_data)
-                db.session.add(soil_type)
-                logger.info(f"Added soil type: {soil[0]}")
+                soils.append(soil_data)
             except Exception as e:
                 logger.error(f"Error adding soil type {soil[0]}: {str(e)}")
                 continue
-                
+        
+        # One bulk INSERT instead of an ORM object per row
+        db.session.bulk_insert_mappings(SoilType, soils)
+        logger.info(f"Added {len(soils)} soil types")
         return True
     except sqlite3.Error as e:
         logger.error(f"Database error: {e}")
@@ -137,6 +138,7 @@ def init_seasons():
             logger.warning("No seasons found in database!")
             return False
             
+        seasons = []
         for season in seasons_data:
             try:
                 season_data = {
@@ -151,13 +153,13 @@ def init_seasons():
                 activities = json.loads(season[7])
                 season_data['farming_activities'] = ', '.join(activities['key_activities'])
                 
-                season_obj = Season(**season_data)
-                db.session.add(season_obj)
-                logger.info(f"Added season: {season[0]}")
+                seasons.append(season_data)
             except Exception as e:
                 logger.error(f"Error adding season {season[0]}: {str(e)}")
                 continue
-                
+        
+        db.session.bulk_insert_mappings(Season, seasons)
+        logger.info(f"Added {len(seasons)} seasons")
         return True
     except sqlite3.Error as e:
         logger.error(f"Database error: {e}")
@@ -171,9 +173,10 @@ def init_crops():
         logger.error("Failed to initialize crops: No data available")
         return False
 
+    crops = []
     for crop_name, data in crop_data.items():
         try:
-            crop_data = {
+            crops.append({
                 'name': crop_name,
                 'scientific_name': 'Scientific name here',
                 'description': f'Detailed description of {crop_name}',
@@ -194,19 +197,18 @@ def init_crops():
                 'yield_range': '2-3 tons/hectare',
                 'market_value': 'High',
                 'storage_life': '3-6 months'
-            }
-            crop = Crop(**crop_data)
-            db.session.add(crop)
-            logger.info(f"Added crop: {crop_name}")
-
+            })
         except Exception as e:
             logger.error(f"Error adding crop {crop_name}: {str(e)}")
             continue
 
+    db.session.bulk_insert_mappings(Crop, crops)
+    logger.info(f"Added {len(crops)} crops")
     return True
 
 def init_database():
     app = create_app()
+    init_models(app)
     with app.app_context():
         try:
             db.create_all()
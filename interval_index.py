@@ -0,0 +1,65 @@
+import numpy as np
+
+# Default slack for CatalogIndex.near_misses, per dimension
+NEAR_MISS_MARGINS = {'temperature': 2.0, 'rainfall': 100.0, 'ph': 0.5}
+# Decimals kept in the reported near-miss gaps
+GAP_DECIMALS = 2
+
+class CatalogIndex:
+    """Range and soil lookups over a ScoringEngine's columns.
+
+    Every query is a few vectorized comparisons over the whole catalog:
+    at 100k crops that is about a millisecond, well below what an
+    interval tree walked in Python costs once it reports thousands of ids.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.names = engine.names
+        self.ranges = {
+            'temperature': (engine.temp_min, engine.temp_max),
+            'rainfall': (engine.rain_min, engine.rain_max),
+            'ph': (engine.ph_min, engine.ph_max),
+        }
+
+    def _soil(self, soil_type):
+        return (self.engine.soil_mask & self.engine.soil_mask_for(soil_type)) != 0
+
+    def _gaps(self, field, x):
+        """Distance from x to each crop's range in field; 0 inside the range"""
+        low, high = self.ranges[field]
+        return np.maximum(low - x, 0) + np.maximum(x - high, 0)
+
+    def candidates(self, temp, rainfall, soil_type):
+        """Sorted indices of crops whose temperature, rainfall and soil all match"""
+        matched = (self._soil(soil_type) & (self._gaps('temperature', float(temp)) == 0)
+                   & (self._gaps('rainfall', float(rainfall)) == 0))
+        return np.flatnonzero(matched)
+
+    def near_misses(self, conditions, margins=None):
+        """Crops that miss temperature or rainfall by no more than the margins.
+
+        Soil must still match and pH may miss by its margin too. Crops that
+        match temperature, rainfall and soil are recommended whatever their
+        pH, so they are never reported. Each entry reports how far each
+        missed range is from the given value, ordered by total miss
+        relative to the margins.
+        """
+        margins = dict(NEAR_MISS_MARGINS, **(margins or {}))
+        gaps = {field: self._gaps(field, float(conditions[field])) for field in self.ranges}
+        within = self._soil(conditions['soil_type'].lower())
+        for field, gap in gaps.items():
+            within &= gap <= margins[field]
+        within &= (gaps['temperature'] > 0) | (gaps['rainfall'] > 0)
+        crops = np.flatnonzero(within)
+
+        total = np.zeros(crops.size)
+        for field, gap in gaps.items():
+            if margins[field]:
+                total += gap[crops] / margins[field]
+        results = []
+        for i in crops[np.argsort(total, kind='stable')].tolist():
+            misses = {field: round(float(gap[i]), GAP_DECIMALS)
+                      for field, gap in gaps.items() if gap[i] > 0}
+            results.append({'name': self.names[i], 'misses': misses})
+        return results
@@ -0,0 +1,205 @@
+"""Precompiled recommendation table: python lookup_table.py build [--db crops.db] [-o crops.lookup]
+
+Scores only change when a temperature, rainfall or pH value crosses one
+of the catalog's range bounds, so the ranked result of recommend_crop is
+constant on each cell of the bounds (see recommendation_cache.cell_index)
+for a given soil and season. The build step ranks every cell once and
+stores the distinct rankings in a pool; the cell array holds an index
+into it. Workers map the file read-only, and a lookup is three
+bisections and one array read, independent of catalog size.
+
+Catalogs whose cell count exceeds --max-cells are not compiled; requests
+then keep using live scoring, as they do whenever the table is missing
+or was built for a different catalog version.
+"""
+import argparse
+import hashlib
+import logging
+import os
+import sys
+import time
+from math import prod
+import numpy as np
+from catalog_snapshot import map_arrays, read_header, write_arrays
+from crop_database_setup import DB_PATH
+from recommendation_cache import cell_index
+from scoring import (MIN_SCORE, TEMP_WEIGHT, RAINFALL_WEIGHT, SOIL_WEIGHT, PH_WEIGHT,
+                     SEASON_WEIGHT)
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'CROPLUT\x01'
+TABLE_PATH = 'crops.lookup'
+# Largest table compiled by default (cells, one uint32 each)
+MAX_CELLS = 5_000_000
+MAX_SCORE = TEMP_WEIGHT + RAINFALL_WEIGHT + SOIL_WEIGHT + PH_WEIGHT + SEASON_WEIGHT
+# Arrays storing catalog.breakpoints, in order
+BOUNDS = ('temp_bounds', 'rain_bounds', 'ph_bounds')
+
+def catalog_digest(catalog):
+    """Fingerprint of the crop order a table's indices refer to"""
+    return hashlib.sha1('\n'.join(catalog.engine.names).encode('utf-8')).hexdigest()
+
+def _samples(bounds):
+    """One value inside each of the 2 * len(bounds) + 1 cells"""
+    b = np.asarray(bounds, dtype=np.float64)
+    samples = np.zeros(2 * len(b) + 1)
+    if len(b):
+        samples[1::2] = b
+        samples[2:-1:2] = (b[:-1] + b[1:]) / 2
+        samples[0] = b[0] - 1
+        samples[-1] = b[-1] + 1
+    return samples
+
+def _within(low, high, values):
+    return (low <= values[:, None]) & (values[:, None] <= high)
+
+def build_table(catalog, max_cells=MAX_CELLS):
+    """(header, arrays) of the compiled table; ValueError when it would exceed max_cells"""
+    engine = catalog.engine
+    n = len(engine)
+    bounds = catalog.breakpoints
+    soils = list(engine.soil_bits)
+    season_masks = sorted(set(catalog.calendar.month_masks[1:]))
+    # The extra soil row answers soils no crop lists
+    shape = (*(2 * len(b) + 1 for b in bounds), len(soils) + 1, len(season_masks))
+    if prod(shape) > max_cells:
+        raise ValueError(f"Catalog needs {prod(shape)} cells, over the limit of {max_cells}")
+
+    temp_ok = _within(engine.temp_min, engine.temp_max, _samples(bounds[0]))
+    rain_ok = _within(engine.rain_min, engine.rain_max, _samples(bounds[1]))
+    ph_ok = _within(engine.ph_min, engine.ph_max, _samples(bounds[2]))
+    soil_ok = (engine.soil_mask & np.array([*engine.soil_bits.values(), 0])[:, None]) != 0
+    season_ok = (engine.season_mask & np.array(season_masks, dtype=np.int64)[:, None]) != 0
+
+    # Rankings are encoded as sorted keys, best score first and ties in catalog order
+    unranked = (MAX_SCORE + 1) * n
+    # Result 0 is the empty ranking, which unmatched cells keep
+    pool = {b'': 0}
+    pool_crops, pool_scores, offsets = [], [], [0, 0]
+    cells = np.zeros(shape, dtype=np.uint32)
+    for t in range(shape[0]):
+        for r in range(shape[1]):
+            matched = temp_ok[t] & rain_ok[r]
+            if not matched.any():
+                continue
+            for s in range(shape[3]):
+                crops = np.flatnonzero(matched & soil_ok[s])
+                if not crops.size:
+                    continue
+                scores = (TEMP_WEIGHT + RAINFALL_WEIGHT + SOIL_WEIGHT
+                          + ph_ok[:, None, crops] * PH_WEIGHT
+                          + season_ok[None, :, crops] * SEASON_WEIGHT)
+                keys = np.where(scores >= MIN_SCORE, (MAX_SCORE - scores) * n + crops, unranked)
+                keys = np.sort(keys.reshape(-1, crops.size), axis=1)
+                distinct, inverse = np.unique(keys, axis=0, return_inverse=True)
+                ids = np.empty(len(distinct), dtype=np.uint32)
+                for i, row in enumerate(distinct):
+                    row = row[row < unranked]
+                    key = row.tobytes()
+                    result = pool.get(key)
+                    if result is None:
+                        result = pool[key] = len(offsets) - 1
+                        pool_crops.append(row % n)
+                        pool_scores.append(MAX_SCORE - row // n)
+                        offsets.append(offsets[-1] + row.size)
+                    ids[i] = result
+                cells[t, r, :, s, :] = ids[inverse.reshape(-1)].reshape(shape[2], shape[4])
+
+    arrays = {name: np.array(b, dtype='<f8') for name, b in zip(BOUNDS, bounds)}
+    arrays['cells'] = cells.astype('<u4')
+    arrays['offsets'] = np.array(offsets, dtype='<i8')
+    arrays['crops'] = np.concatenate([np.empty(0, dtype=np.int64), *pool_crops]).astype('<i4')
+    arrays['scores'] = np.concatenate([np.empty(0, dtype=np.int64), *pool_scores]).astype(np.uint8)
+    header = {
+        'version': catalog.version,
+        'digest': catalog_digest(catalog),
+        'soils': soils,
+        'season_masks': season_masks,
+        'results': len(offsets) - 1,
+    }
+    return header, arrays
+
+class LookupTable:
+    """Mapped table answering the ranked crops and scores for a condition cell"""
+
+    def __init__(self, header, arrays):
+        self.version = header['version']
+        self.digest = header['digest']
+        self.bounds = tuple(arrays[name].tolist() for name in BOUNDS)
+        self.soils = {name: i for i, name in enumerate(header['soils'])}
+        self.seasons = {mask: i for i, mask in enumerate(header['season_masks'])}
+        self.cells = arrays['cells']
+        self.offsets = arrays['offsets']
+        self.crops = arrays['crops']
+        self.scores = arrays['scores']
+        self.nbytes = sum(array.nbytes for array in arrays.values())
+
+    def lookup(self, temp, rainfall, soil_type, ph, season_mask):
+        """(crop indices, scores) best first, or None for a season the table lacks.
+
+        Holds every crop that recommend_crop would return without a limit;
+        the arrays are read-only views of the mapping.
+        """
+        season = self.seasons.get(season_mask)
+        if season is None:
+            return None
+        temps, rains, phs = self.bounds
+        result = self.cells[cell_index(temps, temp), cell_index(rains, rainfall),
+                            cell_index(phs, ph), self.soils.get(soil_type, len(self.soils)),
+                            season]
+        start, end = self.offsets[result:result + 2]
+        return self.crops[start:end], self.scores[start:end]
+
+def write_table(catalog, path=TABLE_PATH, max_cells=MAX_CELLS):
+    """Compile and write the table for catalog; returns build statistics"""
+    start = time.perf_counter()
+    header, arrays = build_table(catalog, max_cells)
+    header['build_s'] = round(time.perf_counter() - start, 3)
+    write_arrays(path, MAGIC, header, arrays)
+    return {
+        'cells': int(arrays['cells'].size),
+        'results': header['results'],
+        'bytes': os.path.getsize(path),
+        'build_s': header['build_s'],
+    }
+
+def load_table(path, catalog):
+    """Map the table at path; ValueError unless it was built for this catalog"""
+    header, arrays = map_arrays(path, MAGIC)
+    if header['version'] != catalog.version or header['digest'] != catalog_digest(catalog):
+        raise ValueError(f"Lookup table {path} was built for a different catalog")
+    table = LookupTable(header, arrays)
+    logger.info(f"Loaded lookup table {path} with {table.cells.size} cells "
+                f"({table.nbytes / 1e6:.1f} MB)")
+    return table
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build or inspect the precompiled recommendation table')
+    parser.add_argument('command', nargs='?', default='build', choices=('build', 'info'))
+    parser.add_argument('--db', default=DB_PATH, help='source database')
+    parser.add_argument('-o', '--output', default=TABLE_PATH, help='table file')
+    parser.add_argument('--max-cells', type=int, default=MAX_CELLS,
+                        help='skip compiling catalogs with more cells than this')
+    args = parser.parse_args(argv)
+
+    if args.command == 'info':
+        header = read_header(args.output, MAGIC)
+        shape = header['arrays']['cells'][2]
+        print(f"{prod(shape)} cells {tuple(shape)}, {header['results']} distinct results, "
+              f"catalog version {header['version']}, built in {header['build_s']}s")
+        return 0
+
+    from catalog import build_catalog
+    try:
+        stats = write_table(build_catalog(args.db), args.output, args.max_cells)
+    except ValueError as e:
+        print(f"Not compiled, requests will use live scoring: {str(e)}")
+        return 1
+    print(f"Wrote {stats['cells']} cells ({stats['results']} distinct results, "
+          f"{stats['bytes'] / 1e6:.1f} MB) to {args.output} in {stats['build_s']}s")
+    return 0
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
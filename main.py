@@ -1,13 +1,27 @@
 from app_factory import create_app
 # from models import db, Crop
-from flask import render_template, request, jsonify
+from flask import (render_template, request, jsonify, make_response, g, Response,
+                   stream_with_context)
 from datetime import datetime
+import hashlib
+import io
+import itertools
 import json
 import logging
-from crop_database_setup import init_db as setup_db
+import time
+from crop_database_setup import verify_schema
+from catalog import get_catalog, reload_catalog, on_swap
+from catalog_watcher import CatalogWatcher
+from recommendation_cache import RecommendationCache
+from season_calendar import season_label
+from metrics import registry, span, start_profile, stop_profile, server_timing
+from batch import columns_from_payload, validate_batch, score_batch
+from scoring import MIN_SCORE, top_k
+from responses import JSON_MIMETYPE, encode, compress, shared_encodings
+from weather import recommend_from_weather
+from bulk import (chunk_rows, read_chunks, stream_results, FORMATS as BULK_FORMATS,
+                  DEFAULT_CHUNKSIZE as BULK_CHUNKSIZE)
 # from sqlalchemy import and_
-import sqlite3
-import os
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -15,11 +29,14 @@ logger = logging.getLogger(__name__)
 
 def create_application():
     """Create and initialize the application"""
-    # Initialize the database first
-    if not setup_db():
-        logger.error("Failed to initialize SQLite database")
+    # Workers only check the schema; migrations run once via crop_database_setup.py
+    if not verify_schema():
+        logger.error("SQLite database is missing or not migrated")
         return None
         
+    # Compile the crop catalog once so requests never touch SQLite
+    reload_catalog()
+    
     # Create Flask app without creating tables
     app = create_app()
     
@@ -31,6 +48,24 @@ app = create_application()
 if not app:
     raise RuntimeError("Failed to initialize application")
 
+recommendation_cache = RecommendationCache(
+    maxsize=app.config['RECOMMENDATION_CACHE_SIZE'],
+    ttl=app.config['RECOMMENDATION_CACHE_TTL'])
+
+def catalog_swapped(catalog):
+    """Drop everything derived from the previous catalog once a new one is live."""
+    global _landing_page
+    recommendation_cache.invalidate(catalog)
+    shared_encodings.clear()
+    _landing_page = None
+
+on_swap(catalog_swapped)
+
+# Pick up catalog edits without restarting workers
+catalog_watcher = None
+if app.config['CATALOG_RELOAD_INTERVAL'] > 0:
+    catalog_watcher = CatalogWatcher(interval=app.config['CATALOG_RELOAD_INTERVAL']).start()
+
 def validate_input(data):
     """Validate input parameters."""
     errors = []
@@ -49,21 +84,41 @@ def validate_input(data):
     if data['soil_type'] not in ['clay', 'loam', 'sandy']:
         errors.append("Invalid soil type")
     
+    if data.get('planting_date') is not None:
+        try:
+            # Only strings: SeasonCalendar.resolve rejects numbers and other types
+            if not isinstance(data['planting_date'], str):
+                raise ValueError
+            datetime.fromisoformat(data['planting_date'])
+        except ValueError:
+            errors.append("Planting date must be an ISO date (YYYY-MM-DD)")
+    
     return errors
 
+def ranking_options(data):
+    """limit and min_score from a request body, plus any validation errors."""
+    errors = []
+    limit = data.get('limit')
+    min_score = data.get('min_score', MIN_SCORE)
+    if limit is not None and (isinstance(limit, bool) or not isinstance(limit, int) or limit < 1):
+        errors.append("Limit must be a positive integer")
+    if isinstance(min_score, bool) or not isinstance(min_score, (int, float)) or not 0 <= min_score <= 100:
+        errors.append("Minimum score must be a number between 0 and 100")
+    return limit, min_score, errors
+
+def resolve_season(planting_date=None):
+    """Season for a planting date, today when omitted. Resolve once per request."""
+    return get_catalog().calendar.resolve(planting_date)
+
 def get_current_season():
     """Determine current growing season based on month."""
-    month = datetime.now().month
-    if 6 <= month <= 10:
-        return "Monsoon season"
-    elif month <= 3 or month >= 11:
-        return "Winter season"
-    else:
-        return "Summer season"
+    return season_label(resolve_season())
 
-def calculate_crop_score(crop_info, conditions):
+def calculate_crop_score(crop_info, conditions, season=None):
     """Calculate compatibility score for a crop under given conditions."""
     score = 0
+    if season is None:
+        season = resolve_season(conditions.get('planting_date'))
     
     # Temperature compatibility
     temp = float(conditions['temperature'])
@@ -85,111 +140,106 @@ def calculate_crop_score(crop_info, conditions):
         score += 15
     
     # Season compatibility
-    if get_current_season() in crop_info['seasons']:
+    if any(name in crop_info['seasons'] for name in season.names):
         score += 10
     
     return score
 
-def recommend_crop(conditions):
-    """Enhanced crop recommendation system with direct database filtering"""
+def live_ranking(catalog, temp, rainfall, soil_type, ph, season, limit=None, min_score=MIN_SCORE):
+    """Indices and scores of the eligible crops, best first, scored with the engine."""
+    # One vectorized pass over the whole catalog; the temperature, rainfall
+    # and soil prefilter is part of the eligible mask
+    with span('scoring'):
+        engine = catalog.engine
+        scores, eligible = engine.evaluate(
+            temp, rainfall, engine.soil_mask_for(soil_type), ph, season.mask)
+        scores, eligible = scores[0], eligible[0] & (scores[0] >= min_score)
+    
+    with span('sorting'):
+        matched = eligible.nonzero()[0]
+        ranked = matched[top_k(scores[matched], limit)]
+    return ranked, scores[ranked]
+
+def score_recommendations(catalog, conditions, season, limit=None, min_score=MIN_SCORE):
+    """Rank the catalog's crops for the given conditions and season.
+
+    Returns at most limit crops scoring at least min_score (never below MIN_SCORE).
+    """
     crop_scores = {}
+    temp = float(conditions['temperature'])
+    rainfall = float(conditions['rainfall'])
+    soil_type = conditions['soil_type'].lower()
+    ph = float(conditions['ph'])
     
-    try:
-        temp = float(conditions['temperature'])
-        rainfall = float(conditions['rainfall'])
-        soil_type = conditions['soil_type'].lower()
-        
-        # Connect to database using absolute path
-        db_path = os.path.abspath(os.path.join(os.path.dirname(__file__), 'crops.db'))
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        # Modified query to ensure we get all necessary fields
-        cursor.execute('''
-            SELECT 
-                name, temp_min, temp_max, rain_min, rain_max,
-                ph_min, ph_max, humidity_min, humidity_max,
-                soil_types, seasons, nutrients,
-                'Detailed information about ' || name as description,
-                'Standard farming practices for ' || name as farming_practices,
-                CASE 
-                    WHEN rain_min > 1000 THEN 'High'
-                    WHEN rain_min > 500 THEN 'Medium'
-                    ELSE 'Low'
-                END as water_needs,
-                'Full Sun' as sunlight_needs
-            FROM crops
-            WHERE (? BETWEEN temp_min AND temp_max)
-            AND (? BETWEEN rain_min AND rain_max)
-            AND soil_types LIKE ?
-        ''', (temp, rainfall, f"%{soil_type}%"))
-        
-        crops_data = cursor.fetchall()
-        logger.info(f"Found {len(crops_data)} matching crops")
-        
-        current_season = get_current_season()
-        
-        for crop in crops_data:
+    # A precompiled table answers with the full ranking for the condition cell
+    table = catalog.lookup
+    found = None if table is None else table.lookup(temp, rainfall, soil_type, ph, season.mask)
+    if found is None:
+        ranked, scores = live_ranking(catalog, temp, rainfall, soil_type, ph, season, limit, min_score)
+    else:
+        with span('lookup'):
+            ranked, scores = found
+            # Rankings are best first, so min_score and limit keep a prefix
+            count = int((scores >= min_score).sum())
+            ranked, scores = ranked[:count][:limit], scores[:count][:limit]
+    # Only crops with good compatibility are eligible
+    logger.info(f"Found {len(ranked)} matching crops")
+    
+    debug = logger.isEnabledFor(logging.DEBUG)
+    with span('details'):
+        for j, score in zip(ranked, scores):
+            crop_info = catalog.crops[j]
+            name = crop_info['name']
             try:
-                (name, t_min, t_max, r_min, r_max, p_min, p_max, 
-                 h_min, h_max, soils, seasons, nutrients, desc, 
-                 practices, water, sun) = crop
-                
-                crop_info = {
-                    'temp_range': (float(t_min), float(t_max)),
-                    'rainfall_range': (float(r_min), float(r_max)),
-                    'ph_range': (float(p_min), float(p_max)),
-                    'humidity_range': (float(h_min), float(h_max)),
-                    'soil_types': [s.strip() for s in soils.split(',')],
-                    'seasons': [s.strip() for s in seasons.split(',')],
-                    'nutrients': json.loads(nutrients)
+                score = int(score)
+                if debug:
+                    logger.debug(f"Crop: {name}, Score: {score}")
+                crop_scores[name] = {
+                    'score': score,
+                    'details': crop_info.details
                 }
-                
-                score = calculate_crop_score(crop_info, conditions)
-                logger.info(f"Crop: {name}, Score: {score}")
-                
-                if score >= 60:  # Only recommend crops with good compatibility
-                    crop_scores[name] = {
-                        'score': score,
-                        'details': {
-                            'optimal_temp': f"{t_min}-{t_max}°C",
-                            'optimal_rainfall': f"{r_min}-{r_max}mm",
-                            'suitable_soil': soils,
-                            'growing_season': seasons,
-                            'nutrients_needed': crop_info['nutrients'],
-                            'description': desc,
-                            'farming_practices': practices,
-                            'water_needs': water,
-                            'sunlight_needs': sun
-                        }
-                    }
             except Exception as e:
                 logger.error(f"Error processing crop {name}: {str(e)}")
                 continue
-        
-        conn.close()
-        sorted_scores = dict(sorted(crop_scores.items(), key=lambda x: x[1]['score'], reverse=True))
-        logger.info(f"Returning {len(sorted_scores)} recommendations")
-        return sorted_scores
+    
+    logger.info(f"Returning {len(crop_scores)} recommendations")
+    return crop_scores
+
+def recommend_crop(conditions, season=None, limit=None, min_score=MIN_SCORE):
+    """Enhanced crop recommendation system backed by the compiled crop catalog.
 
+    Results are memoized per condition cell; callers must not mutate them.
+    """
+    try:
+        catalog = get_catalog()
+        if season is None:
+            season = catalog.calendar.resolve(conditions.get('planting_date'))
+        return recommendation_cache.get_or_compute(
+            catalog, conditions, season.mask,
+            lambda: score_recommendations(catalog, conditions, season, limit, min_score),
+            variant=(limit, min_score))
     except Exception as e:
-        logger.error(f"Database error: {str(e)}")
+        logger.error(f"Recommendation error: {str(e)}")
         return {}
 
+_landing_page = None
+
+def landing_page(catalog):
+    """Form shell for GET /, rendered once per catalog with its ETag."""
+    global _landing_page
+    page = _landing_page
+    if page is None or page[0] is not catalog:
+        body = render_template('index.html', soil_types=catalog.soil_types)
+        page = (catalog, body, hashlib.sha1(body.encode('utf-8')).hexdigest())
+        _landing_page = page
+    return page
+
 @app.route('/', methods=['GET', 'POST'])
 def index():
     """Main route handler."""
-    # Get all soil types from database
-    soil_types = []
-    try:
-        db_path = os.path.abspath(os.path.join(os.path.dirname(__file__), 'crops.db'))
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute('SELECT name FROM soil_types')
-        soil_types = [soil[0].lower() for soil in cursor.fetchall()]
-        conn.close()
-    except sqlite3.Error as e:
-        logger.error(f"Error fetching soil types: {e}")
+    # Soil types come from the compiled catalog, not a per-request query
+    catalog = get_catalog()
+    soil_types = catalog.soil_types
 
     if request.method == 'POST':
         conditions = {
@@ -200,36 +250,264 @@ def index():
             'ph': request.form.get('ph', 6.5),
         }
         
-        errors = validate_input(conditions)
+        with span('validate'):
+            errors = validate_input(conditions)
         if errors:
-            return render_template('index.html', errors=errors, soil_types=soil_types)
+            with span('template_render'):
+                return render_template('index.html', errors=errors, soil_types=soil_types)
         
-        recommendations = recommend_crop(conditions)
+        season = resolve_season()
+        recommendations = recommend_crop(conditions, season)
         logger.info(f"Rendering template with {len(recommendations)} recommendations")
-        return render_template('index.html', 
-                             recommendations=recommendations,
-                             current_season=get_current_season(),
-                             conditions=conditions,
-                             soil_types=soil_types)
+        with span('template_render'):
+            return render_template('index.html', 
+                                 recommendations=recommendations,
+                                 current_season=season_label(season),
+                                 conditions=conditions,
+                                 soil_types=soil_types)
     
-    return render_template('index.html', soil_types=soil_types)
+    _, body, etag = landing_page(catalog)
+    response = make_response(body)
+    response.set_etag(etag)
+    response.last_modified = catalog.built_at
+    # Browsers revalidate every time and get a 304 while the catalog is unchanged
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
-@app.route('/api/recommend', methods=['POST'])
-def api_recommend():
-    """API endpoint for crop recommendations."""
+def recommend_response(conditions):
+    """Response body and status for a single recommendation request."""
     try:
-        conditions = request.get_json()
-        errors = validate_input(conditions)
+        with span('validate'):
+            errors = validate_input(conditions)
+            limit, min_score, ranking_errors = ranking_options(conditions)
+            errors += ranking_errors
         if errors:
-            return jsonify({'errors': errors}), 400
+            return {'errors': errors}, 400
         
-        recommendations = recommend_crop(conditions)
-        return jsonify({
+        season = resolve_season(conditions.get('planting_date'))
+        recommendations = recommend_crop(conditions, season, limit, min_score)
+        if conditions.get('compact'):
+            # Ranked ids and scores only; details come from /api/crops/<id>
+            by_name = get_catalog().by_name
+            recommendations = [
+                {'id': by_name[name].id, 'crop': name, 'score': entry['score']}
+                for name, entry in recommendations.items()
+            ]
+        response = {
             'recommendations': recommendations,
-            'current_season': get_current_season()
-        })
+            'current_season': season_label(season)
+        }
+        if conditions.get('near_misses'):
+            response['near_misses'] = get_catalog().index.near_misses(conditions)
+        return response, 200
+    except Exception as e:
+        return {'error': str(e)}, 500
+
+def batch_response(payload):
+    """Response body and status for a batch recommendation request."""
+    try:
+        try:
+            columns, size = columns_from_payload(payload)
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        
+        options = payload if isinstance(payload, dict) else {}
+        try:
+            season = resolve_season(options.get('planting_date'))
+        except (TypeError, ValueError):
+            return {'error': "Planting date must be an ISO date (YYYY-MM-DD)"}, 400
+        limit, min_score, ranking_errors = ranking_options(options)
+        if ranking_errors:
+            return {'errors': ranking_errors}, 400
+        
+        with span('validate'):
+            values, soils, errors = validate_batch(columns, size)
+        catalog = get_catalog()
+        with span('scoring'):
+            rankings = score_batch(
+                catalog.engine, values, soils, season.mask, limit, min_score)
+        
+        results = []
+        recommended = set()
+        for i in range(size):
+            if errors[i]:
+                results.append({'index': i, 'errors': errors[i]})
+                continue
+            crops, scores = rankings[i]
+            ranked = [
+                {'crop': catalog.crops[j]['name'], 'score': score}
+                for j, score in zip(crops.tolist(), scores.tolist())
+            ]
+            recommended.update(crops.tolist())
+            results.append({'index': i, 'recommendations': ranked})
+        
+        response = {'results': results, 'current_season': season_label(season)}
+        if not options.get('compact'):
+            response['crops'] = {catalog.crops[j].name: catalog.crops[j].details for j in sorted(recommended)}
+        return response, 200
+    except Exception as e:
+        return {'error': str(e)}, 500
+
+def json_response(body, status=200):
+    """Response with body encoded by the fast JSON layer."""
+    return Response(encode(body), status, mimetype=JSON_MIMETYPE)
+
+@app.route('/api/recommend', methods=['POST'])
+def api_recommend():
+    """API endpoint for crop recommendations."""
+    try:
+        body, status = recommend_response(request.get_json())
+        with span('serialize'):
+            return json_response(body, status)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/recommend/batch', methods=['POST'])
+def api_recommend_batch():
+    """API endpoint scoring many condition sets in one request."""
+    try:
+        body, status = batch_response(request.get_json())
+        with span('serialize'):
+            return json_response(body, status)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/crops/<int:crop_id>')
+def api_crop(crop_id):
+    """Details of one crop, for clients using compact recommendations."""
+    crop = get_catalog().by_id.get(crop_id)
+    if crop is None:
+        return jsonify({'error': 'Unknown crop'}), 404
+    response = json_response({'id': crop.id, 'name': crop.name, 'details': crop.details})
+    response.set_etag(hashlib.sha1(response.get_data()).hexdigest())
+    return response.make_conditional(request)
+
+def query_number(name, default, convert):
+    """Query parameter name converted with convert, default when absent, None when invalid"""
+    value = request.args.get(name)
+    if value is None:
+        return default
+    try:
+        return convert(value)
+    except ValueError:
+        return None
+
+@app.route('/api/recommend/bulk', methods=['POST'])
+def api_recommend_bulk():
+    """Stream recommendations for a CSV request body as NDJSON or CSV."""
+    output_format = request.args.get('format', 'ndjson')
+    if output_format not in BULK_FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(BULK_FORMATS)}"}), 400
+    planting_date = request.args.get('planting_date')
+    try:
+        resolve_season(planting_date)
+    except ValueError:
+        return jsonify({'error': "Planting date must be an ISO date (YYYY-MM-DD)"}), 400
+    chunksize = query_number('chunksize', BULK_CHUNKSIZE, int)
+    if chunksize is None or chunksize < 1:
+        return jsonify({'error': 'chunksize must be a positive integer'}), 400
+
+    chunks = read_chunks(request.stream, 'csv', chunk_rows(get_catalog(), chunksize))
+    try:
+        # Parse the first chunk now so an unreadable body is a 400, not a broken stream
+        first = next(chunks, None)
+    except ValueError as e:
+        # pandas' ParserError and UnicodeDecodeError are ValueErrors
+        return jsonify({'error': f"Invalid CSV body: {str(e)}"}), 400
+    body = stream_results(itertools.chain(() if first is None else (first,), chunks),
+                          planting_date, output_format)
+    mimetype = 'application/x-ndjson' if output_format == 'ndjson' else 'text/csv'
+    return Response(stream_with_context(body), mimetype=mimetype)
+
+@app.route('/api/recommend/weather', methods=['POST'])
+def api_recommend_weather():
+    """Stream per-station season qualification counts for a daily weather CSV body."""
+    soil_type = request.args.get('soil_type', '')
+    ph = query_number('ph', 6.5, float)
+    errors = []
+    if soil_type not in get_catalog().soil_types:
+        errors.append("Invalid soil type")
+    if ph is None:
+        errors.append("All values must be numbers")
+    elif not 0 <= ph <= 14:
+        errors.append("pH must be between 0 and 14")
+    if errors:
+        return jsonify({'errors': errors}), 400
+
+    lines = io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+    results = recommend_from_weather(lines, soil_type, ph)
+    try:
+        # Pull the first station now so a bad header is a 400, not a broken stream
+        first = next(results, None)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    body = (json.dumps(result) + '\n' for result in itertools.chain(
+        () if first is None else (first,), results))
+    return Response(stream_with_context(body), mimetype='application/x-ndjson')
+
+@app.before_request
+def start_request_timing():
+    g.request_started = time.perf_counter()
+    # Opt-in per-request span breakdown, returned as a Server-Timing header
+    if request.headers.get('X-Profile'):
+        g.profile_token = start_profile()
+
+@app.after_request
+def finish_request_timing(response):
+    elapsed = time.perf_counter() - g.pop('request_started', time.perf_counter())
+    registry.histogram('crop_http_request_seconds', 'HTTP request latency',
+                       endpoint=request.endpoint or 'unknown').observe(elapsed)
+    token = g.pop('profile_token', None)
+    if token is not None:
+        spans = stop_profile(token) + [('total', elapsed)]
+        response.headers['Server-Timing'] = server_timing(spans)
+    return response
+
+@app.after_request
+def compress_json(response):
+    """gzip/brotli JSON bodies above the configured size when the client accepts it"""
+    if (response.mimetype != JSON_MIMETYPE or response.direct_passthrough
+            or response.is_streamed or 'Content-Encoding' in response.headers):
+        return response
+    response.vary.add('Accept-Encoding')
+    body, coding = compress(response.get_data(), request.headers.get('Accept-Encoding'),
+                            app.config['RESPONSE_COMPRESS_MIN_SIZE'])
+    if coding is not None:
+        response.set_data(body)
+        response.headers['Content-Encoding'] = coding
+        # The compressed bytes differ from the identity body the ETag was computed for
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+    return response
+
+@app.teardown_request
+def discard_profile(exc):
+    token = g.pop('profile_token', None)
+    if token is not None:
+        stop_profile(token)
+
+def cache_metrics():
+    stats = recommendation_cache.stats()
+    return [
+        ('crop_recommendation_cache_hits_total', 'counter', 'Recommendation cache hits', stats['hits']),
+        ('crop_recommendation_cache_misses_total', 'counter', 'Recommendation cache misses', stats['misses']),
+        ('crop_recommendation_cache_evictions_total', 'counter', 'LRU evictions', stats['evictions']),
+        ('crop_recommendation_coalesced_total', 'counter',
+         'Requests that waited for an identical in-flight computation', stats['coalesced']),
+        ('crop_recommendation_cache_entries', 'gauge', 'Cached condition cells', stats['size']),
+        ('crop_catalog_crops', 'gauge', 'Crops in the active catalog', len(get_catalog())),
+        ('crop_catalog_version', 'gauge', 'catalog_meta version of the active catalog', get_catalog().version),
+        ('crop_catalog_reloads_total', 'counter', 'Catalog hot reloads',
+         catalog_watcher.reloads if catalog_watcher else 0),
+    ]
+
+registry.add_collector(cache_metrics)
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus metrics endpoint."""
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
     app.run(debug=True)
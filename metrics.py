@@ -0,0 +1,115 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Latency buckets in seconds, tuned for sub-millisecond hot-path spans
+DEFAULT_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+)
+
+# Spans recorded for the current request when profiling was requested
+_profile = ContextVar('profile', default=None)
+
+class Histogram:
+    """Cumulative-bucket latency histogram in the Prometheus style"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+class Registry:
+    """Named histograms plus callbacks that report counters and gauges"""
+
+    def __init__(self):
+        self._histograms = {}
+        self._help = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def histogram(self, name, help_text='', **labels):
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram())
+                self._help.setdefault(name, help_text)
+        return histogram
+
+    def add_collector(self, collect):
+        """Register a callable returning (name, type, help, value) tuples"""
+        self._collectors.append(collect)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        seen = set()
+        for (name, labels), histogram in sorted(self._histograms.items()):
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {name} {self._help.get(name, '')}")
+                lines.append(f"# TYPE {name} histogram")
+            counts, total, count = histogram.snapshot()
+            cumulative = 0
+            for bound, n in zip(histogram.buckets + (float('inf'),), counts):
+                cumulative += n
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {total}")
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+        for collect in self._collectors:
+            for name, kind, help_text, value in collect():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.append(f"{name} {value}")
+        return '\n'.join(lines) + '\n'
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}'
+
+registry = Registry()
+
+@contextmanager
+def span(name):
+    """Time a block into crop_span_seconds{span=name} and the request profile"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        registry.histogram('crop_span_seconds', 'Time spent in hot-path stages', span=name).observe(elapsed)
+        profile = _profile.get()
+        if profile is not None:
+            profile.append((name, elapsed))
+
+def start_profile():
+    """Collect spans for the current request; returns a token for stop_profile"""
+    return _profile.set([])
+
+def stop_profile(token):
+    """Stop collecting and return the recorded (name, seconds) spans"""
+    spans = _profile.get() or []
+    _profile.reset(token)
+    return spans
+
+def server_timing(spans):
+    """Spans rendered as a Server-Timing header value (durations in ms)"""
+    return ', '.join(f"{name};dur={seconds * 1000:.3f}" for name, seconds in spans)
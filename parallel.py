@@ -0,0 +1,109 @@
+"""Process-pool execution for bulk and raster scoring jobs.
+
+The parent copies the scoring engine's per-crop arrays into one shared
+memory block; each worker attaches to it once at startup and builds a
+ScoringEngine over views of that block, so tasks carry only their chunk
+of input rows or raster tile. Work is submitted with a bounded look-ahead
+and results are yielded back in input order.
+"""
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from scoring import ARRAYS, ScoringEngine
+
+logger = logging.getLogger(__name__)
+
+# Chunks in flight per worker; bounds memory while keeping every core busy
+LOOKAHEAD = 2
+
+class SharedCatalog:
+    """Engine arrays of a compiled catalog copied once into shared memory"""
+
+    def __init__(self, catalog):
+        engine = catalog.engine
+        n = len(engine)
+        self._shm = shared_memory.SharedMemory(create=True, size=max(len(ARRAYS) * n * 8, 1))
+        for i, name in enumerate(ARRAYS):
+            _view(self._shm.buf, i, n, getattr(engine, name).dtype)[:] = getattr(engine, name)
+        # Everything a worker needs to rebuild the engine; sent once per worker
+        self.spec = {
+            'name': self._shm.name,
+            'size': n,
+            'dtypes': {name: getattr(engine, name).dtype.str for name in ARRAYS},
+            'names': engine.names,
+            'soil_bits': engine.soil_bits,
+            'season_bits': engine.season_bits,
+            'month_masks': catalog.calendar.month_masks,
+        }
+
+    def close(self):
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _view(buf, i, n, dtype):
+    # Every ARRAYS column is 8 bytes wide, laid out one after another
+    return np.frombuffer(buf, dtype=dtype, count=n, offset=i * n * 8)
+
+# Set in each worker process by _attach
+_shm = None
+_engine = None
+_month_masks = None
+
+def _attach(spec):
+    global _shm, _engine, _month_masks
+    _shm = shared_memory.SharedMemory(name=spec['name'])
+    arrays = {
+        name: _view(_shm.buf, i, spec['size'], np.dtype(spec['dtypes'][name]))
+        for i, name in enumerate(ARRAYS)
+    }
+    _engine = ScoringEngine.from_arrays(
+        spec['names'], arrays, spec['soil_bits'], spec['season_bits'])
+    _month_masks = np.asarray(spec['month_masks'], dtype=np.int64)
+
+def _score_task(frame, default_mask, start, output_format):
+    from bulk import encode_results, score_chunk
+    return encode_results(
+        score_chunk(_engine, _month_masks, frame, default_mask, start), output_format)
+
+def score_parallel(catalog, chunks, default_mask, output_format='ndjson', workers=2):
+    """Score chunks on a process pool, yielding each chunk's encoded output in order"""
+    with SharedCatalog(catalog) as shared, ProcessPoolExecutor(
+            max_workers=workers, initializer=_attach, initargs=(shared.spec,)) as pool:
+        logger.info(f"Scoring bulk job on {workers} worker processes")
+        pending = deque()
+        start = 0
+        for frame in chunks:
+            pending.append(pool.submit(_score_task, frame, default_mask, start, output_format))
+            start += len(frame)
+            if len(pending) >= workers * LOOKAHEAD:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def _tile_task(job, tile):
+    from raster import score_tile
+    return score_tile(_engine, job, tile)
+
+def score_tiles(catalog, job, tiles, workers=2):
+    """Score raster tiles on a process pool; yields each tile's count of pixels with data.
+
+    Workers write their tiles straight into the job's output file.
+    """
+    with SharedCatalog(catalog) as shared, ProcessPoolExecutor(
+            max_workers=workers, initializer=_attach, initargs=(shared.spec,)) as pool:
+        logger.info(f"Scoring raster on {workers} worker processes")
+        pending = deque()
+        for tile in tiles:
+            pending.append(pool.submit(_tile_task, job, tile))
+            if len(pending) >= workers * LOOKAHEAD:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
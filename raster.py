@@ -0,0 +1,276 @@
+"""Crop suitability rasters: python raster.py --temperature t.npy --rainfall r.npy --soil soil.npy -o best.npy
+
+Scores every pixel of gridded climate layers with the calculate_crop_score
+rules. Layers are 2-D arrays of the same shape: temperature, rainfall and
+(optionally) pH as floats, and soil as integer class codes indexing
+--soil-classes. .npy layers are memory-mapped and read one tile at a
+time, so memory stays bounded by the tile size whatever the grid size;
+'file.npz:key' names a member of an .npz archive, which is loaded whole.
+
+Two outputs are supported, both written tile by tile into a .npy file:
+'best' holds the index of the top recommended crop per pixel (-1 where
+none qualifies or the inputs are missing), 'scores' a uint8 score band
+per crop. A sidecar <output>.json lists the crop of each index or band.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import uuid
+import numpy as np
+from scoring import MIN_SCORE, weigh
+
+logger = logging.getLogger(__name__)
+
+MODES = ('best', 'scores')
+DEFAULT_TILE = 512
+# Pixels x crops scored at once; bounds the score matrices of a tile
+CELL_BUDGET = 4_000_000
+# pH used when no pH layer is given, as in the web form
+DEFAULT_PH = 6.5
+# Best-crop value for pixels where no crop qualifies or inputs are missing
+NO_CROP = -1
+LAYERS = ('temperature', 'rainfall', 'ph', 'soil')
+
+def open_layer(source):
+    """Read-only 2-D array for a layer: 'x.npy' is memory-mapped, 'x.npz:key' loaded"""
+    path, key = source, None
+    if '.npz:' in source:
+        path, _, key = source.rpartition(':')
+    if path.endswith('.npz'):
+        with np.load(path) as archive:
+            if not key:
+                raise ValueError(f"Name the array to use from {path}, e.g. {path}:temperature")
+            array = archive[key]
+    else:
+        array = np.load(path, mmap_mode='r')
+    if array.ndim != 2:
+        raise ValueError(f"Layer {source} must be 2-D, got shape {array.shape}")
+    return array
+
+def tiles(shape, size=DEFAULT_TILE):
+    """(row0, row1, col0, col1) windows covering a grid in row-major order"""
+    rows, cols = shape
+    for r in range(0, rows, size):
+        for c in range(0, cols, size):
+            yield r, min(r + size, rows), c, min(c + size, cols)
+
+# (job id, {layer name: array}) of the job this process is scoring. Layers
+# open once per job, so .npz members load only once, and are released when
+# the job ends: a later job must not read mappings of since-rewritten files.
+_job_layers = (None, {})
+
+def _layer(job, name):
+    global _job_layers
+    job_id, arrays = _job_layers
+    if job_id != job['id']:
+        job_id, arrays = _job_layers = (job['id'], {})
+    array = arrays.get(name)
+    if array is None:
+        array = arrays[name] = open_layer(job['layers'][name])
+    return array
+
+def _release(job):
+    global _job_layers
+    if _job_layers[0] == job['id']:
+        _job_layers = (None, {})
+
+def _window(job, name, tile, dtype):
+    r0, r1, c0, c1 = tile
+    if name not in job['layers']:
+        return np.full((r1 - r0) * (c1 - c0), job['ph'], dtype=dtype)
+    return np.asarray(_layer(job, name)[r0:r1, c0:c1], dtype=dtype).ravel()
+
+def _cells(bounds, values, soil_codes, soil_count):
+    """(first pixel of each distinct cell, cell of every pixel) for a tile.
+
+    Cells follow recommendation_cache.cell_index: a value's position among
+    the catalog's range bounds, with the bounds themselves as cells.
+    """
+    key = np.zeros(soil_codes.size, dtype=np.int64)
+    for b, x in zip(bounds, values):
+        i = np.searchsorted(b, x)
+        exact = b[np.minimum(i, len(b) - 1)] == x if len(b) else False
+        key = key * (2 * len(b) + 1) + 2 * i + exact
+    key = key * soil_count + soil_codes
+    _, first, inverse = np.unique(key, return_index=True, return_inverse=True)
+    return first, inverse.reshape(-1)
+
+def score_tile(engine, job, tile):
+    """Score one tile and write it into the job's output; returns its pixels with data"""
+    r0, r1, c0, c1 = tile
+    temps = _window(job, 'temperature', tile, np.float64)
+    rains = _window(job, 'rainfall', tile, np.float64)
+    phs = _window(job, 'ph', tile, np.float64)
+    codes = _window(job, 'soil', tile, np.int64)
+    # The last soil mask is 0: codes outside the class list match no soil,
+    # and negative codes mark missing data
+    soil_masks = job['soil_masks']
+    unknown = len(soil_masks) - 1
+    soil_codes = np.where((codes >= 0) & (codes < unknown), codes, unknown)
+    soils = soil_masks[soil_codes]
+    valid = np.isfinite(temps) & np.isfinite(rains) & np.isfinite(phs) & (codes >= 0)
+
+    # Pixels in the same condition cell score alike: score one per cell
+    first, inverse = _cells(job['bounds'], (temps, rains, phs), soil_codes, len(soil_masks))
+    temps, rains, phs, soils = temps[first], rains[first], phs[first], soils[first]
+
+    crops = job['crops']
+    step = max(1, CELL_BUDGET // max(temps.size, 1))
+    out = np.load(job['output'], mmap_mode='r+')
+    if job['mode'] == 'scores':
+        for k in range(0, len(crops), step):
+            block = crops[k:k + step]
+            m = engine.match(temps, rains, soils, phs, job['season_mask'], crops=block)
+            scores = weigh(m)[inverse] * valid[:, None]
+            out[k:k + len(block), r0:r1, c0:c1] = scores.T.reshape(len(block), r1 - r0, c1 - c0)
+    else:
+        best = np.full(temps.size, NO_CROP, dtype=out.dtype)
+        best_score = np.full(temps.size, MIN_SCORE - 1, dtype=np.int64)
+        rows = np.arange(temps.size)
+        for k in range(0, len(crops), step):
+            block = crops[k:k + step]
+            scores, eligible = engine.evaluate(temps, rains, soils, phs, job['season_mask'], crops=block)
+            scores = np.where(eligible, scores, -1)
+            top = scores.argmax(axis=1)
+            top_score = scores[rows, top]
+            # Strictly better only, so ties go to the earlier crop as in recommend_crop
+            better = top_score > best_score
+            best[better] = block[top[better]]
+            best_score[better] = top_score[better]
+        best = best[inverse]
+        best[~valid] = NO_CROP
+        out[r0:r1, c0:c1] = best.reshape(r1 - r0, c1 - c0)
+    out.flush()
+    del out
+    return int(valid.sum())
+
+def suitability(catalog, layers, output, mode='best', season_mask=None, crops=None,
+                soil_classes=None, tile=DEFAULT_TILE, workers=1, ph=DEFAULT_PH):
+    """Write a best-crop or per-crop score raster for the layers; returns its metadata.
+
+    layers maps 'temperature', 'rainfall', 'soil' and optionally 'ph' to
+    sources accepted by open_layer. crops limits scoring to those names,
+    and soil_classes names the soil of each code (default: the catalog's
+    soil types in order).
+    """
+    if mode not in MODES:
+        raise ValueError(f"Mode must be one of {', '.join(MODES)}")
+    missing = [name for name in LAYERS if name != 'ph' and not layers.get(name)]
+    if missing:
+        raise ValueError(f"Missing layers: {', '.join(missing)}")
+    job = {
+        'id': uuid.uuid4().hex,
+        'layers': {name: source for name, source in layers.items() if source},
+        'output': output,
+        'mode': mode,
+        'ph': ph,
+    }
+    try:
+        return _run_job(catalog, job, season_mask, crops, soil_classes, tile, workers)
+    finally:
+        _release(job)
+
+def _run_job(catalog, job, season_mask, crops, soil_classes, tile, workers):
+    shapes = {name: _layer(job, name).shape for name in job['layers']}
+    shape = shapes['temperature']
+    if any(s != shape for s in shapes.values()):
+        raise ValueError(f"Layers must share one shape, got {shapes}")
+
+    engine = catalog.engine
+    if crops is None:
+        indices = np.arange(len(catalog.crops))
+    else:
+        unknown = [name for name in crops if name not in catalog.by_name]
+        if unknown:
+            raise ValueError(f"Unknown crops: {', '.join(unknown)}")
+        indices = np.array([engine.names.index(name) for name in crops], dtype=np.intp)
+    classes = list(catalog.soil_types if soil_classes is None else soil_classes)
+    if season_mask is None:
+        season_mask = catalog.calendar.resolve().mask
+
+    mode, output = job['mode'], job['output']
+    if mode == 'scores':
+        np.lib.format.open_memmap(output, mode='w+', dtype=np.uint8, shape=(len(indices), *shape))
+    else:
+        dtype = np.int16 if len(catalog.crops) < np.iinfo(np.int16).max else np.int32
+        np.lib.format.open_memmap(output, mode='w+', dtype=dtype, shape=shape)
+    job.update({
+        'crops': indices,
+        'soil_masks': np.array([*(engine.soil_mask_for(name.lower()) for name in classes), 0],
+                               dtype=np.int64),
+        'season_mask': season_mask,
+        'bounds': [np.array(bounds) for bounds in catalog.breakpoints],
+    })
+
+    windows = tiles(shape, tile)
+    if workers > 1:
+        from parallel import score_tiles
+        counts = score_tiles(catalog, job, windows, workers)
+    else:
+        counts = (score_tile(engine, job, window) for window in windows)
+    with_data = sum(counts)
+
+    meta = {
+        'mode': mode,
+        'shape': list(shape),
+        'crops': [engine.names[i] for i in indices] if mode == 'scores' else list(engine.names),
+        'soil_classes': classes,
+        'season_mask': int(season_mask),
+        'nodata': NO_CROP if mode == 'best' else 0,
+        'pixels_with_data': with_data,
+    }
+    with open(f'{output}.json', 'w') as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Crop suitability rasters from gridded climate layers')
+    parser.add_argument('--temperature', required=True, help='temperature layer (.npy or .npz:key)')
+    parser.add_argument('--rainfall', required=True, help='rainfall layer')
+    parser.add_argument('--soil', required=True, help='soil class code layer')
+    parser.add_argument('--ph', help=f'pH layer (default: {DEFAULT_PH} everywhere)')
+    parser.add_argument('--soil-classes', help='comma-separated soil name of each code '
+                                               '(default: the catalog soil types in order)')
+    parser.add_argument('-o', '--output', required=True, help='output .npy raster')
+    parser.add_argument('--mode', choices=MODES, default='best',
+                        help='best-crop index raster or one score band per crop')
+    parser.add_argument('--crops', help='comma-separated crops to score (default: all)')
+    parser.add_argument('--planting-date', help='ISO date that selects the season (default: today)')
+    parser.add_argument('--tile', type=int, default=DEFAULT_TILE, help='tile edge in pixels')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='score tiles on this many processes (0 = one per CPU)')
+    args = parser.parse_args(argv)
+
+    from catalog import get_catalog
+    catalog = get_catalog()
+    try:
+        season = catalog.calendar.resolve(args.planting_date)
+    except ValueError:
+        logger.error("Planting date must be an ISO date (YYYY-MM-DD)")
+        return 1
+    try:
+        meta = suitability(
+            catalog,
+            {'temperature': args.temperature, 'rainfall': args.rainfall,
+             'soil': args.soil, 'ph': args.ph},
+            args.output,
+            mode=args.mode,
+            season_mask=season.mask,
+            crops=args.crops.split(',') if args.crops else None,
+            soil_classes=args.soil_classes.split(',') if args.soil_classes else None,
+            tile=args.tile,
+            workers=args.workers or os.cpu_count(),
+        )
+    except (OSError, ValueError) as e:
+        logger.error(f"Raster scoring failed: {str(e)}")
+        return 1
+    rows, cols = meta['shape']
+    print(f"Wrote {args.mode} raster {args.output} ({rows}x{cols}, "
+          f"{meta['pixels_with_data']} pixels with data)")
+    return 0
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+    sys.exit(main())
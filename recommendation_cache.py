@@ -0,0 +1,175 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from concurrent.futures import Future
+import numpy as np
+
+class RecommendationCache:
+    """Bounded LRU/TTL cache of recommend_crop results keyed on condition cells.
+
+    Scores are a step function of the inputs: they only change when a value
+    crosses one of the catalog's range boundaries. The key therefore records
+    which interval between consecutive breakpoints (or which breakpoint
+    itself, since ranges are inclusive) each input falls into, so any two
+    inputs with identical results share an entry. Entries belong to the
+    newest catalog seen and are dropped when a newer one arrives; requests
+    still holding an older catalog during a swap are computed uncached
+    rather than evicting the new entries.
+
+    Concurrent misses on the same key are coalesced: the first caller
+    computes and the others wait for its result instead of repeating the
+    work, so a burst of identical requests costs one computation.
+
+    Cached results are shared between callers and must not be mutated.
+    """
+
+    def __init__(self, maxsize=4096, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        # Computations in progress, keyed like entries
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._catalog = None
+        # Version of the newest catalog seen; invalidate() keeps it unless given a catalog
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.coalesced = 0
+
+    def key(self, catalog, conditions, season_mask, variant=None):
+        """Interval cell of the conditions under the given catalog.
+
+        variant distinguishes differently shaped results for the same cell,
+        e.g. a (limit, min_score) pair.
+        """
+        temps, rains, phs = catalog.breakpoints
+        return (
+            cell_index(temps, float(conditions['temperature'])),
+            cell_index(rains, float(conditions['rainfall'])),
+            cell_index(phs, float(conditions['ph'])),
+            conditions['soil_type'],
+            season_mask,
+            variant,
+        )
+
+    def get_or_compute(self, catalog, conditions, season_mask, compute, variant=None):
+        """Return the cached result for the conditions' cell, computing it on a miss"""
+        if not self._adopt(catalog):
+            return compute()
+        key = self.key(catalog, conditions, season_mask, variant)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = Future()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            return flight.result()
+
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                self._land(key, flight)
+            flight.set_exception(e)
+            raise
+
+        with self._lock:
+            self._land(key, flight)
+            if self._catalog is catalog:
+                self._entries[key] = (now + self.ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        # Waiters wake after the entry is stored, so later callers hit it
+        flight.set_result(value)
+        return value
+
+    def invalidate(self, catalog=None):
+        """Drop every entry, e.g. after the crop tables change.
+
+        Pass the catalog now active when it replaced another one; it counts
+        as the newest catalog even if it came from a database with lower
+        version numbers.
+        """
+        with self._lock:
+            self._reset(catalog)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._inflight),
+            }
+
+    def _land(self, key, flight):
+        # A reset may already have dropped this flight or replaced it
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+
+    def _adopt(self, catalog):
+        """Whether entries may be kept for catalog, switching to it if it is newer"""
+        with self._lock:
+            if self._catalog is not catalog:
+                if catalog.version < self._version:
+                    return False
+                self._reset(catalog)
+            return True
+
+    def _reset(self, catalog):
+        if self._entries:
+            self.invalidations += 1
+        self._entries.clear()
+        # Keys of the old catalog's cells mean something else under the new one
+        self._inflight.clear()
+        self._catalog = catalog
+        if catalog is not None:
+            self._version = catalog.version
+
+# Engine columns holding the bounds of each crop range field
+RANGE_COLUMNS = {
+    'temp_range': ('temp_min', 'temp_max'),
+    'rainfall_range': ('rain_min', 'rain_max'),
+    'ph_range': ('ph_min', 'ph_max'),
+}
+
+def breakpoints(catalog, field):
+    """Sorted distinct range bounds of a crop field, e.g. 'temp_range'"""
+    low, high = (getattr(catalog.engine, column) for column in RANGE_COLUMNS[field])
+    return np.unique(np.concatenate([low, high])).tolist()
+
+def cell_index(bounds, value):
+    """Cell of value among 2 * len(bounds) + 1 cells.
+
+    Odd cells are the bounds themselves, even cells the open gaps between them.
+    """
+    i = bisect_left(bounds, value)
+    if i < len(bounds) and bounds[i] == value:
+        return 2 * i + 1
+    return 2 * i
@@ -0,0 +1,110 @@
+"""JSON encoding and compression for the recommendation API.
+
+Bodies are encoded with orjson when it is installed and the standard
+library otherwise; both produce compact output in dict order, so the
+ranked recommendations keep their ranking. The recommendations dict of a response is the memoized result shared by
+every request in the same condition cell, so its encoding (crop details
+included) is memoized too and a cache hit only encodes the envelope.
+"""
+import gzip
+import json
+import threading
+from collections import OrderedDict
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+JSON_MIMETYPE = 'application/json'
+# Bodies smaller than this are sent uncompressed
+COMPRESS_MIN_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+# Top-level keys whose dict values are shared, read-only results
+SHARED_KEYS = ('recommendations',)
+
+def dumps(obj):
+    """obj as compact JSON bytes, keys in dict order"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+class EncodedCache:
+    """Bounded LRU of encoded JSON for shared objects, keyed by identity.
+
+    Each entry keeps its object alive, so an id cannot be reused by a
+    different object while it is cached.
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def encode(self, obj):
+        key = id(obj)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is obj:
+                self._entries.move_to_end(key)
+                return entry[1]
+        encoded = dumps(obj)
+        with self._lock:
+            self._entries[key] = (obj, encoded)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return encoded
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+shared_encodings = EncodedCache()
+
+def encode(body):
+    """Response body as JSON bytes, reusing the encoding of shared results"""
+    if not isinstance(body, dict) or not any(isinstance(body.get(key), dict) for key in SHARED_KEYS):
+        return dumps(body)
+    return b'{' + b','.join(
+        dumps(key) + b':' + (
+            shared_encodings.encode(value)
+            if key in SHARED_KEYS and isinstance(value, dict) else dumps(value))
+        for key, value in body.items()
+    ) + b'}'
+
+def negotiate(accept_encoding):
+    """Best supported content coding from an Accept-Encoding value, or None"""
+    accepted = {}
+    for item in (accept_encoding or '').split(','):
+        coding, _, params = item.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    for coding in ('br', 'gzip'):
+        if coding == 'br' and brotli is None:
+            continue
+        if accepted.get(coding, accepted.get('*', 0.0)) > 0:
+            return coding
+    return None
+
+def compress(body, accept_encoding, min_size=COMPRESS_MIN_SIZE):
+    """(body, content coding) with body compressed when worthwhile and accepted"""
+    if len(body) < min_size:
+        return body, None
+    coding = negotiate(accept_encoding)
+    if coding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY), coding
+    if coding == 'gzip':
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0), coding
+    return body, None
@@ -0,0 +1,145 @@
+import numpy as np
+
+# Weights awarded by calculate_crop_score for each satisfied condition
+TEMP_WEIGHT = 30
+RAINFALL_WEIGHT = 25
+SOIL_WEIGHT = 20
+PH_WEIGHT = 15
+SEASON_WEIGHT = 10
+
+# Only crops scoring at least this much are recommended
+MIN_SCORE = 60
+
+# Per-crop columns an engine scores against, in a fixed order
+ARRAYS = (
+    'temp_min', 'temp_max', 'rain_min', 'rain_max', 'ph_min', 'ph_max',
+    'humidity_min', 'humidity_max', 'soil_mask', 'season_mask',
+)
+
+class ScoringEngine:
+    """Columnar view of a crop catalog that scores every crop in one pass.
+
+    Ranges are held as float arrays and soils/seasons as integer bitmasks,
+    so scoring N condition sets against M crops is a handful of broadcast
+    comparisons producing an (N, M) matrix.
+    """
+
+    def __init__(self, crops, soil_names=(), season_names=()):
+        self.names = [crop['name'] for crop in crops]
+        self.temp_min = np.array([c['temp_range'][0] for c in crops], dtype=np.float64)
+        self.temp_max = np.array([c['temp_range'][1] for c in crops], dtype=np.float64)
+        self.rain_min = np.array([c['rainfall_range'][0] for c in crops], dtype=np.float64)
+        self.rain_max = np.array([c['rainfall_range'][1] for c in crops], dtype=np.float64)
+        self.ph_min = np.array([c['ph_range'][0] for c in crops], dtype=np.float64)
+        self.ph_max = np.array([c['ph_range'][1] for c in crops], dtype=np.float64)
+        self.humidity_min = np.array([c['humidity_range'][0] for c in crops], dtype=np.float64)
+        self.humidity_max = np.array([c['humidity_range'][1] for c in crops], dtype=np.float64)
+
+        self.soil_bits = _bit_table(soil_names, (c['soil_types'] for c in crops))
+        self.season_bits = _bit_table(season_names, (c['seasons'] for c in crops))
+        self.soil_mask = np.array([self.soil_mask_for(*c['soil_types']) for c in crops], dtype=np.int64)
+        self.season_mask = np.array([self.season_mask_for(*c['seasons']) for c in crops], dtype=np.int64)
+
+    @classmethod
+    def from_arrays(cls, names, arrays, soil_bits, season_bits):
+        """Engine over existing column arrays (keyed by ARRAYS) without copying them"""
+        engine = cls.__new__(cls)
+        engine.names = list(names)
+        for name in ARRAYS:
+            setattr(engine, name, arrays[name])
+        engine.soil_bits = dict(soil_bits)
+        engine.season_bits = dict(season_bits)
+        return engine
+
+    def __len__(self):
+        return len(self.names)
+
+    def soil_mask_for(self, *names):
+        """Bitmask for the given soil names; unknown names contribute nothing"""
+        return _mask(self.soil_bits, names)
+
+    def season_mask_for(self, *names):
+        """Bitmask for the given season names; unknown names contribute nothing"""
+        return _mask(self.season_bits, names)
+
+    def match(self, temps, rainfalls, soil_masks, phs, season_masks, crops=None):
+        """Per-condition boolean matrices, each shaped (n_conditions, n_crops).
+
+        Pass an index array as ``crops`` to evaluate only those columns.
+        """
+        cols = slice(None) if crops is None else crops
+        temps = np.asarray(temps, dtype=np.float64).reshape(-1, 1)
+        rainfalls = np.asarray(rainfalls, dtype=np.float64).reshape(-1, 1)
+        phs = np.asarray(phs, dtype=np.float64).reshape(-1, 1)
+        soil_masks = np.asarray(soil_masks, dtype=np.int64).reshape(-1, 1)
+        season_masks = np.asarray(season_masks, dtype=np.int64).reshape(-1, 1)
+        return {
+            'temp': (self.temp_min[cols] <= temps) & (temps <= self.temp_max[cols]),
+            'rainfall': (self.rain_min[cols] <= rainfalls) & (rainfalls <= self.rain_max[cols]),
+            'soil': (self.soil_mask[cols] & soil_masks) != 0,
+            'ph': (self.ph_min[cols] <= phs) & (phs <= self.ph_max[cols]),
+            'season': (self.season_mask[cols] & season_masks) != 0,
+        }
+
+    def score_matrix(self, temps, rainfalls, soil_masks, phs, season_masks):
+        """Weighted scores for every (condition set, crop) pair"""
+        return weigh(self.match(temps, rainfalls, soil_masks, phs, season_masks))
+
+    def evaluate(self, temps, rainfalls, soil_masks, phs, season_masks, crops=None):
+        """Scores and the recommendable mask, both shaped (n_conditions, n_crops).
+
+        A crop is recommendable when temperature, rainfall and soil all match
+        (the prefilter recommend_crop has always applied) and it reaches MIN_SCORE.
+        """
+        m = self.match(temps, rainfalls, soil_masks, phs, season_masks, crops)
+        scores = weigh(m)
+        return scores, m['temp'] & m['rainfall'] & m['soil'] & (scores >= MIN_SCORE)
+
+    def score(self, temp, rainfall, soil_type, ph, season):
+        """Scores of every crop for a single condition set"""
+        return self.score_matrix(
+            temp, rainfall, self.soil_mask_for(soil_type), ph, self.season_mask_for(season)
+        )[0]
+
+def weigh(m):
+    """Combine the boolean matrices from ScoringEngine.match into scores"""
+    return (
+        m['temp'] * TEMP_WEIGHT
+        + m['rainfall'] * RAINFALL_WEIGHT
+        + m['soil'] * SOIL_WEIGHT
+        + m['ph'] * PH_WEIGHT
+        + m['season'] * SEASON_WEIGHT
+    ).astype(np.int64)
+
+def top_k(scores, k=None):
+    """Indices of the k highest scores, best first; equal scores keep index order.
+
+    Partitions around the k-th largest score instead of sorting everything,
+    then orders just the selected k.
+    """
+    scores = np.asarray(scores)
+    if k is None or k >= scores.size:
+        return np.argsort(-scores, kind='stable')
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    kth = np.partition(scores, scores.size - k)[scores.size - k]
+    above = np.flatnonzero(scores > kth)
+    ties = np.flatnonzero(scores == kth)[:k - above.size]
+    chosen = np.concatenate([above, ties])
+    return chosen[np.argsort(-scores[chosen], kind='stable')]
+
+def _bit_table(known, per_crop):
+    names = list(dict.fromkeys(known))
+    for values in per_crop:
+        for value in sorted(values):
+            if value not in names:
+                names.append(value)
+    if len(names) > 63:
+        raise ValueError(f"Too many distinct values for a 64-bit mask: {len(names)}")
+    return {name: 1 << i for i, name in enumerate(names)}
+
+def _mask(bits, names):
+    mask = 0
+    for name in names:
+        mask |= bits.get(name, 0)
+    return mask
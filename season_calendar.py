@@ -0,0 +1,51 @@
+from collections import namedtuple
+from datetime import date, datetime
+
+# A resolved season: the season names active in a month and their bitmask
+Season = namedtuple('Season', ['names', 'mask'])
+
+class SeasonCalendar:
+    """Month to season lookup compiled from the seasons table.
+
+    Each season covers start_month..end_month inclusive, wrapping past
+    December when end_month < start_month (Rabi runs 11 -> 3). Months
+    where seasons overlap resolve to all of them.
+    """
+
+    def __init__(self, seasons, season_bits):
+        names = [[] for _ in range(13)]
+        for season in seasons:
+            start, end = season['start_month'], season['end_month']
+            if not (start and end):
+                continue
+            months = range(start, end + 1) if start <= end else [*range(start, 13), *range(1, end + 1)]
+            for month in months:
+                names[month].append(season['name'])
+        self._by_month = tuple(
+            Season(tuple(n), sum(season_bits.get(name, 0) for name in set(n))) for n in names
+        )
+
+    def for_month(self, month):
+        return self._by_month[month]
+
+    def resolve(self, when=None):
+        """Season for a planting date (date, datetime or ISO string); today when omitted.
+
+        Raises ValueError for anything else, e.g. a JSON number.
+        """
+        if when is None:
+            when = date.today()
+        elif isinstance(when, str):
+            when = datetime.fromisoformat(when)
+        elif not isinstance(when, date):
+            raise ValueError(f"Planting date must be an ISO date string, got {when!r}")
+        return self._by_month[when.month]
+
+    @property
+    def month_masks(self):
+        """Season bitmask per month, indexable by month number (index 0 unused)"""
+        return [season.mask for season in self._by_month]
+
+def season_label(season):
+    """Display form of a resolved season, e.g. 'Rabi' or 'Rabi, Zaid'"""
+    return ', '.join(season.names)
@@ -0,0 +1,13 @@
+import os
+import sys
+import pytest
+
+# Import the app without starting the catalog watcher thread
+os.environ.setdefault('CATALOG_RELOAD_INTERVAL', '0')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(scope='session')
+def catalog():
+    """A catalog compiled from crops.db, separate from the app's active one"""
+    from catalog import build_catalog
+    return build_catalog()
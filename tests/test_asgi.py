@@ -0,0 +1,64 @@
+"""ASGI serving mode: Flask parity and keeping slow clients off the thread pool."""
+import asyncio
+import json
+import time
+import asgi
+import main
+
+CONDITIONS = {'temperature': 22, 'rainfall': 650, 'soil_type': 'loam', 'humidity': 70, 'ph': 6.5}
+BULK_CSV = b'temperature,rainfall,humidity,ph,soil_type\n22,650,70,6.5,loam\n'
+
+async def request(method, path, chunks=(b'',), headers=(), delay=0.0):
+    """(status, body) of one request whose body arrives in chunks, delay seconds apart"""
+    pending = list(chunks)
+    sent = []
+
+    async def receive():
+        if not pending:
+            return {'type': 'http.disconnect'}
+        if delay:
+            await asyncio.sleep(delay)
+        return {'type': 'http.request', 'body': pending.pop(0), 'more_body': bool(pending)}
+
+    async def send(message):
+        sent.append(message)
+
+    path, _, query = path.partition('?')
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query.encode(),
+             'headers': list(headers)}
+    await asgi.app(scope, receive, send)
+    return sent[0]['status'], b''.join(m.get('body', b'') for m in sent[1:])
+
+def recommend():
+    body = json.dumps(CONDITIONS).encode()
+    return request('POST', '/api/recommend', [body], [(b'content-type', b'application/json')])
+
+def test_native_and_bridged_routes_match_flask():
+    client = main.app.test_client()
+    status, body = asyncio.run(recommend())
+    assert (status, json.loads(body)) == (200, client.post('/api/recommend', json=CONDITIONS).get_json())
+
+    status, body = asyncio.run(request('POST', '/api/recommend/bulk?format=csv', [BULK_CSV[:20], BULK_CSV[20:]]))
+    assert (status, body) == (200, client.post('/api/recommend/bulk?format=csv', data=BULK_CSV).get_data())
+
+    # Flask answers bodies that are not JSON, in both modes
+    status, body = asyncio.run(request('POST', '/api/recommend', [b'not json']))
+    response = client.post('/api/recommend', data=b'not json')
+    assert (status, body) == (response.status_code, response.get_data())
+
+def test_slow_uploads_leave_the_pool_to_the_api():
+    async def run():
+        # More trickling uploads than pool threads, each taking about a second
+        uploads = [asyncio.ensure_future(request('POST', '/api/recommend/bulk', [BULK_CSV] * 10, delay=0.1))
+                   for _ in range(asgi.executor._max_workers + 2)]
+        await asyncio.sleep(0.2)
+        started = time.perf_counter()
+        status, _ = await recommend()
+        elapsed = time.perf_counter() - started
+        results = await asyncio.gather(*uploads)
+        return status, elapsed, results
+
+    status, elapsed, results = asyncio.run(run())
+    assert status == 200
+    assert elapsed < 0.5
+    assert all(status == 200 for status, _ in results)
@@ -0,0 +1,43 @@
+"""Batch validation and scoring must agree with the single-request path."""
+import random
+import pytest
+import batch
+import main
+from batch import columns_from_payload, score_batch, validate_batch
+from scoring import MIN_SCORE
+
+VALUES = {
+    'temperature': [-5, 0, 22.5, 50, 51, '30', 'abc', 'nan', True],
+    'rainfall': [-1, 0, 650, 5000, 5001, '800', 'x', 'inf'],
+    'humidity': [-1, 0, 70, 100, 101, '55', ''],
+    'ph': [-0.1, 0, 6.5, 14, 14.5, '7', 'seven'],
+    'soil_type': ['clay', 'loam', 'sandy', 'Clay', 'peat', ''],
+}
+
+def test_batch_validation_matches_single():
+    rng = random.Random(0)
+    rows = [{field: rng.choice(values) for field, values in VALUES.items()} for _ in range(3000)]
+    columns, size = columns_from_payload({'conditions': rows})
+    _, _, errors = validate_batch(columns, size)
+    for row, row_errors in zip(rows, errors):
+        assert row_errors == main.validate_input(row), row
+
+@pytest.mark.parametrize('limit, min_score', [(None, MIN_SCORE), (3, MIN_SCORE), (None, 90), (2, 100)])
+def test_blocked_scoring_matches_live_ranking(catalog, monkeypatch, limit, min_score):
+    # Blocks of 7 rows, so the batch spans many of them
+    monkeypatch.setattr(batch, 'CELL_BUDGET', 7 * len(catalog))
+    rng = random.Random(1)
+    rows = [{'temperature': rng.uniform(5, 40), 'rainfall': rng.uniform(200, 3000),
+             'humidity': 70, 'ph': rng.uniform(4.5, 8.5),
+             'soil_type': rng.choice(['clay', 'loam', 'sandy'])} for _ in range(200)]
+    season = catalog.calendar.resolve('2025-11-15')
+    columns, size = columns_from_payload(rows)
+    values, soils, _ = validate_batch(columns, size)
+    rankings = score_batch(catalog.engine, values, soils, season.mask, limit, min_score)
+
+    assert len(rankings) == size
+    for row, (crops, scores) in zip(rows, rankings):
+        expected = main.live_ranking(catalog, row['temperature'], row['rainfall'], row['soil_type'],
+                                     row['ph'], season, limit, min_score)
+        assert crops.tolist() == expected[0].tolist()
+        assert scores.tolist() == expected[1].tolist()
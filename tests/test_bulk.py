@@ -0,0 +1,49 @@
+"""Bulk scoring: chunk sizing and how bad input is reported."""
+import json
+import pytest
+import bulk
+import main
+
+HEADER = 'plot_id,temperature,rainfall,humidity,ph,soil_type,planting_date\n'
+
+@pytest.fixture
+def client():
+    return main.app.test_client()
+
+def test_chunks_shrink_with_the_catalog():
+    assert bulk.chunk_rows(range(18)) == bulk.DEFAULT_CHUNKSIZE
+    assert bulk.chunk_rows(range(100_000)) == bulk.CHUNK_CELLS // 100_000
+    assert bulk.chunk_rows(range(100_000), chunksize=10) == 10
+    assert bulk.chunk_rows(range(10 * bulk.CHUNK_CELLS)) == 1
+
+def test_rows_match_single_requests(client):
+    rows = ['a,22,650,70,6.5,loam,', 'b,30,900,70,7,clay,2025-07-01',
+            'c,x,650,70,6.5,loam,', 'd,22,650,70,6.5,loam,07/01/2025']
+    response = client.post('/api/recommend/bulk?chunksize=1&planting_date=2025-01-15',
+                           data=HEADER + '\n'.join(rows))
+    results = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    assert response.status_code == 200
+    assert [r['plot_id'] for r in results] == ['a', 'b', 'c', 'd']
+    # Rows without a planting_date use the request's
+    for result, when in zip(results, ('2025-01-15', '2025-07-01')):
+        conditions = dict(zip(HEADER.strip().split(','), rows[result['row']].split(',')))
+        expected = main.recommend_crop(conditions, main.resolve_season(when))
+        assert [(r['crop'], r['score']) for r in result['recommendations']] == \
+            [(name, entry['score']) for name, entry in expected.items()]
+    assert results[2]['errors'] == ['All values must be numbers']
+    assert results[3]['errors'] == [bulk.DATE_ERROR]
+
+@pytest.mark.parametrize('body', [HEADER + 'a,22,650,70,6.5,"loam\n', b'temperature\n\xff\xfe\n'])
+def test_unreadable_body_is_a_400(client, body):
+    response = client.post('/api/recommend/bulk', data=body)
+    assert response.status_code == 400
+    assert response.get_json()['error'].startswith('Invalid CSV body')
+
+@pytest.mark.parametrize('chunksize', ['abc', '0', '1.5'])
+def test_bad_chunksize_is_a_400(client, chunksize):
+    response = client.post(f'/api/recommend/bulk?chunksize={chunksize}', data=HEADER)
+    assert response.status_code == 400
+
+def test_cli_reports_missing_input(tmp_path):
+    assert bulk.main([str(tmp_path / 'missing.csv')]) == 1
@@ -0,0 +1,68 @@
+"""Bulk catalog import: upserts by name, validation and a single version bump."""
+import csv
+import pytest
+from benchmarks.synthetic import generate_catalog
+from catalog import build_catalog
+from catalog_import import import_catalog
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    return str(path)
+
+@pytest.fixture
+def db(tmp_path):
+    return generate_catalog(str(tmp_path / 'crops.db'), 18)
+
+NEW_CROP = {
+    'name': 'Millet', 'temp_min': 25, 'temp_max': 35, 'rain_min': 300, 'rain_max': 600,
+    'ph_min': 5.5, 'ph_max': 7.5, 'humidity_min': 40, 'humidity_max': 60,
+    'seasons': 'Kharif', 'soil_types': 'sandy,loam',
+    'nutrients': '{"nitrogen": "low", "phosphorus": "low", "potassium": "low"}',
+}
+
+def test_upsert_updates_inserts_and_bumps_version_once(db, tmp_path):
+    before = build_catalog(db)
+    rice = dict.fromkeys(NEW_CROP, '')
+    rice.update(name='Rice', temp_max=36)
+    path = write_csv(tmp_path / 'crops.csv', [rice, NEW_CROP])
+    report = import_catalog({'crops': path}, db)
+
+    assert report['errors'] == []
+    assert (report['tables']['crops']['updated'], report['tables']['crops']['inserted']) == (1, 1)
+    after = build_catalog(db)
+    assert after.version == before.version + 1
+    # Blank cells keep the stored values
+    assert after.by_name['Rice']['temp_range'] == (20.0, 36.0)
+    assert after.by_name['Rice']['soil_types'] == before.by_name['Rice']['soil_types']
+    assert after.by_name['Millet']['rainfall_range'] == (300.0, 600.0)
+
+def test_new_crops_need_every_column(db, tmp_path):
+    partial = dict(NEW_CROP, soil_types='')
+    path = write_csv(tmp_path / 'crops.csv', [partial, dict(NEW_CROP, name='Sorghum', ph_min=8)])
+    report = import_catalog({'crops': path}, db)
+
+    assert report['tables']['crops']['inserted'] == 0
+    assert 'new rows need soil_types' in report['errors'][0]
+    assert 'ph_min > ph_max' in report['errors'][1]
+    assert 'Millet' not in build_catalog(db).by_name
+
+@pytest.mark.parametrize('start, end', [(6, 13), (0, 10), (6.5, 10), ('June', 10)])
+def test_season_months_must_be_whole_months(db, tmp_path, start, end):
+    path = write_csv(tmp_path / 'seasons.csv', [{'name': 'Kharif', 'start_month': start, 'end_month': end}])
+    report = import_catalog({'seasons': path}, db)
+
+    assert report['tables']['seasons']['skipped'] == 1
+    # The stored season is untouched and the catalog still compiles
+    catalog = build_catalog(db).prime()
+    assert catalog.calendar.for_month(7).names == ('Kharif',)
+
+def test_season_months_are_stored_as_integers(db, tmp_path):
+    path = write_csv(tmp_path / 'seasons.csv', [{'name': 'Kharif', 'start_month': '5.0', 'end_month': 9}])
+    report = import_catalog({'seasons': path}, db)
+
+    assert report['errors'] == []
+    kharif = next(s for s in build_catalog(db).seasons if s['name'] == 'Kharif')
+    assert (kharif['start_month'], kharif['end_month']) == (5, 9)
@@ -0,0 +1,67 @@
+"""Hot reload: the watcher swaps in edited catalogs and never an older one."""
+import sqlite3
+import pytest
+import catalog as catalog_module
+import main
+from benchmarks.synthetic import generate_catalog
+from catalog import build_catalog, get_catalog, reload_catalog
+from catalog_watcher import CatalogWatcher
+from crop_database_setup import DB_PATH
+
+CONDITIONS = {'temperature': 22, 'rainfall': 650, 'soil_type': 'loam', 'humidity': 70, 'ph': 6.5}
+
+@pytest.fixture
+def db(tmp_path):
+    path = generate_catalog(str(tmp_path / 'crops.db'), 18)
+    yield path
+    # Later tests expect the app's own catalog
+    reload_catalog(DB_PATH)
+
+def write(db, sql, *params):
+    conn = sqlite3.connect(db)
+    with conn:
+        conn.execute(sql, params)
+    conn.close()
+
+def test_watcher_reloads_edited_catalog(db):
+    before = reload_catalog(db)
+    assert 'Maize' in main.recommend_crop(CONDITIONS)
+    # Long interval: the test polls with check() instead of the thread
+    watcher = CatalogWatcher(db, interval=60).start()
+    try:
+        assert not watcher.check()
+        write(db, "UPDATE crops SET temp_max = 21 WHERE name = 'Maize'")
+        assert watcher.check()
+        assert not watcher.check()
+    finally:
+        watcher.stop()
+
+    active = get_catalog()
+    assert active.by_name['Maize']['temp_range'] == (20.0, 21.0)
+    assert watcher.reloads == 1 and active.version > before.version
+    # The swap dropped recommendations cached for the previous catalog
+    assert 'Maize' not in main.recommend_crop(CONDITIONS)
+
+def test_older_catalog_of_same_database_is_discarded(db, monkeypatch):
+    reload_catalog(db)
+    old = build_catalog(db)
+    write(db, "UPDATE crops SET temp_max = 21 WHERE name = 'Maize'")
+    newer = reload_catalog(db)
+
+    # A slow reload that read the database before the write finishes last
+    monkeypatch.setattr(catalog_module, 'load_catalog', lambda db_path: old)
+    assert reload_catalog(db) is newer
+    assert get_catalog() is newer
+
+def test_catalog_of_another_database_is_swapped_in(db):
+    write(db, "UPDATE crops SET temp_max = 21 WHERE name = 'Maize'")
+    edited = reload_catalog(db)
+    seed = reload_catalog(DB_PATH)
+
+    assert seed.version < edited.version
+    assert get_catalog() is seed
+    main.recommend_crop(CONDITIONS)
+    hits = main.recommendation_cache.stats()['hits']
+    # The cache serves the swapped-in catalog despite its lower version
+    assert 'Maize' in main.recommend_crop(CONDITIONS)
+    assert main.recommendation_cache.stats()['hits'] == hits + 1
@@ -0,0 +1,42 @@
+"""Catalog snapshots load the same catalog and are never served stale."""
+import sqlite3
+import pytest
+from benchmarks.synthetic import generate_catalog
+from catalog import build_catalog
+from catalog_snapshot import build_snapshot, load_snapshot, source_stamp, write_snapshot
+
+@pytest.fixture
+def db(tmp_path):
+    return generate_catalog(str(tmp_path / 'crops.db'), 200)
+
+def test_snapshot_matches_built_catalog(db, tmp_path):
+    path = str(tmp_path / 'crops.catalog')
+    build_snapshot(db, path)
+    built, loaded = build_catalog(db), load_snapshot(path, db)
+
+    assert loaded.version == built.version
+    assert list(loaded.crops) == list(built.crops)
+    assert loaded.by_name['Variety 000042'] == built.by_name['Variety 000042']
+    assert loaded.engine.names == built.engine.names
+
+def test_snapshot_is_stale_after_a_write(db, tmp_path):
+    path = str(tmp_path / 'crops.catalog')
+    build_snapshot(db, path)
+    conn = sqlite3.connect(db)
+    with conn:
+        conn.execute("UPDATE crops SET temp_max = temp_max + 1 WHERE id = 1")
+    conn.close()
+    with pytest.raises(ValueError, match='stale'):
+        load_snapshot(path, db)
+
+def test_snapshot_of_an_older_version_is_rejected(db, tmp_path):
+    path = str(tmp_path / 'crops.catalog')
+    # A write lands between reading the rows and taking the stamp
+    catalog = build_catalog(db)
+    conn = sqlite3.connect(db)
+    with conn:
+        conn.execute("UPDATE crops SET temp_max = temp_max + 1 WHERE id = 1")
+    conn.close()
+    write_snapshot(catalog, path, db, source_stamp(db))
+    with pytest.raises(ValueError, match='version'):
+        load_snapshot(path, db)
@@ -0,0 +1,10 @@
+"""Cold start: importing the serving entry point stays within budget and off the ORM and pandas."""
+from benchmarks.import_time import DEFERRED_MODULES, import_times, main
+
+def test_serving_import_skips_deferred_modules():
+    imported = {name for name, _, _, _ in import_times('main')}
+    assert imported.isdisjoint(DEFERRED_MODULES)
+
+def test_serving_import_is_within_budget(capsys):
+    # Fastest of three cold imports, as the CLI reports it
+    assert main(['--runs', '3']) == 0, capsys.readouterr().out
@@ -0,0 +1,27 @@
+"""Candidate lookups and near misses over the catalog's engine columns."""
+import random
+
+def test_candidates_match_prefilter(catalog):
+    rng = random.Random(0)
+    for _ in range(500):
+        temp, rainfall = rng.uniform(5, 40), rng.choice([400, 500, 800, 1250, 2000, 3100])
+        soil = rng.choice(['clay', 'loam', 'sandy', 'peat'])
+        expected = [i for i, crop in enumerate(catalog.crops)
+                    if crop['temp_range'][0] <= temp <= crop['temp_range'][1]
+                    and crop['rainfall_range'][0] <= rainfall <= crop['rainfall_range'][1]
+                    and soil in crop['soil_types']]
+        assert catalog.index.candidates(temp, rainfall, soil).tolist() == expected
+
+def test_near_misses_skip_recommended_crops(catalog):
+    conditions = {'temperature': 25, 'rainfall': 800, 'ph': 7.8, 'soil_type': 'loam'}
+    names = {entry['name'] for entry in catalog.index.near_misses(conditions)}
+    # These miss only on pH, so they are still recommended
+    assert not names & {'Maize', 'Groundnut', 'Soybean'}
+
+def test_near_misses_report_rounded_gaps(catalog):
+    conditions = {'temperature': 24.7, 'rainfall': 800, 'ph': 6.5, 'soil_type': 'loam'}
+    misses = {entry['name']: entry['misses'] for entry in catalog.index.near_misses(conditions)}
+    # Garlic and Peas top out at 24°C
+    assert misses['Garlic'] == {'temperature': 0.7, 'rainfall': 100.0}
+    assert misses['Peas'] == {'temperature': 0.7}
+    assert all(gap == round(gap, 2) for entry in misses.values() for gap in entry.values())
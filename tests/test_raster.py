@@ -0,0 +1,50 @@
+"""Suitability rasters: per-pixel results match live scoring, and each job reads its own inputs."""
+import numpy as np
+import pytest
+import main
+import raster
+
+@pytest.fixture
+def layers(tmp_path):
+    rng = np.random.default_rng(0)
+    shape = (40, 30)
+    paths = {}
+    for name, values in (('temperature', rng.uniform(5, 40, shape)),
+                         ('rainfall', rng.uniform(200, 3000, shape)),
+                         ('ph', rng.uniform(4.5, 8.5, shape)),
+                         ('soil', rng.integers(-1, 4, shape))):
+        paths[name] = str(tmp_path / f'{name}.npy')
+        np.save(paths[name], values)
+    return paths
+
+def test_best_crop_matches_live_ranking(catalog, layers, tmp_path):
+    output = str(tmp_path / 'best.npy')
+    season = catalog.calendar.resolve('2025-07-01')
+    raster.suitability(catalog, layers, output, season_mask=season.mask, tile=16)
+    best = np.load(output)
+    values = {name: np.load(path) for name, path in layers.items()}
+    classes = list(catalog.soil_types)
+
+    for r, c in np.ndindex(best.shape):
+        code = values['soil'][r, c]
+        if code < 0:
+            assert best[r, c] == raster.NO_CROP
+            continue
+        soil = classes[code] if code < len(classes) else 'unknown'
+        ranked, _ = main.live_ranking(catalog, values['temperature'][r, c], values['rainfall'][r, c],
+                                      soil, values['ph'][r, c], season)
+        assert best[r, c] == (ranked[0] if ranked.size else raster.NO_CROP)
+
+def test_rewritten_layers_are_read_again(catalog, layers, tmp_path):
+    output = str(tmp_path / 'best.npy')
+    raster.suitability(catalog, layers, output)
+    assert raster._job_layers[0] is None
+
+    # Rewrite the inputs in place with a different grid
+    for name in ('temperature', 'rainfall', 'ph'):
+        np.save(layers[name], np.full((5, 6), {'temperature': 25.0, 'rainfall': 700.0, 'ph': 6.5}[name]))
+    np.save(layers['soil'], np.full((5, 6), catalog.soil_types.index('loam')))
+    meta = raster.suitability(catalog, layers, output)
+
+    assert meta['shape'] == [5, 6]
+    assert meta['pixels_with_data'] == 30
@@ -0,0 +1,50 @@
+"""Recommendation cache: a burst of identical misses computes once."""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from recommendation_cache import RecommendationCache
+
+CONDITIONS = {'temperature': 22, 'rainfall': 650, 'soil_type': 'loam', 'humidity': 70, 'ph': 6.5}
+CALLERS = 6
+
+def burst(cache, catalog, compute):
+    """Results of CALLERS concurrent lookups of the same cell, started while compute is held open"""
+    release = threading.Event()
+
+    def held():
+        release.wait(5)
+        return compute()
+
+    with ThreadPoolExecutor(CALLERS) as pool:
+        futures = [pool.submit(cache.get_or_compute, catalog, CONDITIONS, 1, held) for _ in range(CALLERS)]
+        # Let every follower join the leader's flight before it finishes
+        deadline = time.monotonic() + 2
+        while cache.stats()['coalesced'] < CALLERS - 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        return [future.exception() or future.result() for future in futures]
+
+def test_concurrent_misses_are_coalesced(catalog):
+    cache = RecommendationCache()
+    calls = []
+    results = burst(cache, catalog, lambda: calls.append(1) or {'Maize': 80})
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    stats = cache.stats()
+    assert (stats['misses'], stats['coalesced'], stats['in_flight'], stats['size']) == (1, CALLERS - 1, 0, 1)
+    # Nearby conditions in the same cell hit the stored entry
+    assert cache.get_or_compute(catalog, {**CONDITIONS, 'humidity': 40}, 1, pytest.fail) is results[0]
+
+def test_failed_computation_reaches_every_waiter(catalog):
+    cache = RecommendationCache()
+
+    def compute():
+        raise RuntimeError('scoring failed')
+
+    results = burst(cache, catalog, compute)
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert cache.stats()['in_flight'] == 0 and cache.stats()['size'] == 0
+    # The next caller computes again instead of waiting on the failed flight
+    assert cache.get_or_compute(catalog, CONDITIONS, 1, lambda: {'Maize': 80}) == {'Maize': 80}
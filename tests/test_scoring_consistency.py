@@ -0,0 +1,88 @@
+"""Live scoring, the recommendation cache and the lookup table must rank alike."""
+import random
+import numpy as np
+import pytest
+import main
+from catalog import build_catalog
+from lookup_table import LookupTable, build_table, load_table, write_table
+from scoring import MIN_SCORE
+
+def reference_ranking(catalog, conditions, season):
+    """(name, score) best first, applying calculate_crop_score crop by crop"""
+    ranked = []
+    for i, crop in enumerate(catalog.crops):
+        temp_ok = crop['temp_range'][0] <= conditions['temperature'] <= crop['temp_range'][1]
+        rain_ok = crop['rainfall_range'][0] <= conditions['rainfall'] <= crop['rainfall_range'][1]
+        if not (temp_ok and rain_ok and conditions['soil_type'] in crop['soil_types']):
+            continue
+        score = main.calculate_crop_score(crop, conditions, season)
+        if score >= MIN_SCORE:
+            ranked.append((-score, i, crop['name']))
+    return [(name, -score) for score, _, name in sorted(ranked)]
+
+def probe_values(bounds):
+    """Every bound, a value between each pair and one beyond each end"""
+    values = list(bounds)
+    values += [(a + b) / 2 for a, b in zip(bounds, bounds[1:])]
+    return values + [bounds[0] - 1, bounds[-1] + 1]
+
+def random_conditions(catalog, n, seed=0):
+    rng = random.Random(seed)
+    temps, rains, phs = (probe_values(b) for b in catalog.breakpoints)
+    soils = [*catalog.engine.soil_bits, 'peat']
+    seasons = [catalog.calendar.for_month(month) for month in range(1, 13)]
+    for _ in range(n):
+        conditions = {
+            'temperature': rng.choice(temps), 'rainfall': rng.choice(rains),
+            'ph': rng.choice(phs), 'humidity': 70, 'soil_type': rng.choice(soils),
+        }
+        yield conditions, rng.choice(seasons)
+
+@pytest.fixture(scope='module')
+def table(catalog):
+    return LookupTable(*build_table(catalog))
+
+def test_live_ranking_matches_reference(catalog):
+    for conditions, season in random_conditions(catalog, 2000):
+        ranked, scores = main.live_ranking(
+            catalog, conditions['temperature'], conditions['rainfall'], conditions['soil_type'],
+            conditions['ph'], season)
+        names = [catalog.crops[j]['name'] for j in ranked]
+        assert list(zip(names, scores.tolist())) == reference_ranking(catalog, conditions, season)
+
+def test_lookup_table_matches_live_ranking(catalog, table):
+    for conditions, season in random_conditions(catalog, 2000, seed=1):
+        args = (conditions['temperature'], conditions['rainfall'], conditions['soil_type'],
+                conditions['ph'])
+        crops, scores = table.lookup(*args, season.mask)
+        ranked, live_scores = main.live_ranking(catalog, *args, season)
+        assert crops.tolist() == ranked.tolist()
+        assert scores.tolist() == live_scores.tolist()
+
+@pytest.mark.parametrize('limit, min_score', [(None, MIN_SCORE), (3, MIN_SCORE), (None, 90), (2, 100)])
+def test_score_recommendations_same_with_table(catalog, table, limit, min_score):
+    compiled = build_catalog()
+    compiled.__dict__['lookup'] = table
+    for conditions, season in random_conditions(catalog, 300, seed=2):
+        live = main.score_recommendations(catalog, conditions, season, limit, min_score)
+        looked_up = main.score_recommendations(compiled, conditions, season, limit, min_score)
+        assert list(looked_up.items()) == list(live.items())
+
+def test_cached_results_match_live_scoring():
+    catalog = main.get_catalog()
+    main.recommendation_cache.invalidate()
+    # Many draws share a condition cell, so most of these are cache hits
+    for conditions, season in random_conditions(catalog, 3000, seed=3):
+        cached = main.recommend_crop(conditions, season)
+        live = main.score_recommendations(catalog, conditions, season)
+        assert list(cached.items()) == list(live.items())
+    assert main.recommendation_cache.stats()['hits'] > 0
+
+def test_written_table_round_trips(catalog, tmp_path):
+    path = str(tmp_path / 'crops.lookup')
+    write_table(catalog, path)
+    mapped = load_table(path, catalog)
+    direct = LookupTable(*build_table(catalog))
+    assert np.array_equal(mapped.cells, direct.cells)
+    assert np.array_equal(mapped.crops, direct.crops)
+    assert np.array_equal(mapped.scores, direct.scores)
@@ -0,0 +1,42 @@
+"""Month to season lookup: Rabi wraps past December and overlap months resolve to every season."""
+from datetime import date, datetime
+import pytest
+import main
+from season_calendar import SeasonCalendar, season_label
+
+CONDITIONS = {'temperature': 22, 'rainfall': 650, 'soil_type': 'loam', 'humidity': 70, 'ph': 6.5}
+
+@pytest.mark.parametrize('month, names', [
+    (1, ('Rabi',)), (2, ('Rabi',)), (3, ('Rabi', 'Zaid')), (4, ('Zaid',)), (5, ('Zaid',)),
+    (6, ('Kharif', 'Zaid')), (7, ('Kharif',)), (10, ('Kharif',)), (11, ('Rabi',)), (12, ('Rabi',)),
+])
+def test_seed_seasons_by_month(catalog, month, names):
+    season = catalog.calendar.for_month(month)
+    assert sorted(season.names) == list(names)
+    bits = catalog.engine.season_bits
+    assert season.mask == sum(bits[name] for name in names)
+
+def test_wrapping_season_covers_both_years():
+    calendar = SeasonCalendar([{'name': 'Winter', 'start_month': 12, 'end_month': 2},
+                               {'name': 'Spring', 'start_month': 2, 'end_month': 4},
+                               {'name': 'Unset', 'start_month': None, 'end_month': None}],
+                              {'Winter': 1, 'Spring': 2, 'Unset': 4})
+    assert [calendar.for_month(month).mask for month in range(1, 13)] == [1, 3, 2, 2, *[0] * 7, 1]
+    assert season_label(calendar.for_month(2)) == 'Winter, Spring'
+
+def test_resolve_accepts_dates_and_rejects_other_types(catalog):
+    calendar = catalog.calendar
+    assert calendar.resolve('2025-12-15').names == ('Rabi',)
+    assert calendar.resolve(date(2025, 3, 1)) == calendar.resolve(datetime(2025, 3, 1, 9))
+    assert calendar.resolve() == calendar.for_month(date.today().month)
+    with pytest.raises(ValueError, match='ISO date string'):
+        calendar.resolve(20250301)
+
+def test_endpoint_reports_season_of_planting_date():
+    client = main.app.test_client()
+    response = client.post('/api/recommend', json={**CONDITIONS, 'planting_date': '2025-01-10'})
+    assert response.get_json()['current_season'] == 'Rabi'
+
+    response = client.post('/api/recommend', json={**CONDITIONS, 'planting_date': 20250110})
+    assert response.status_code == 400
+    assert response.get_json()['errors'] == ['Planting date must be an ISO date (YYYY-MM-DD)']
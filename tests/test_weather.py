@@ -0,0 +1,42 @@
+"""Season-year scoring of daily weather series and its input checks."""
+from datetime import date, timedelta
+import pytest
+import main
+import weather
+
+def daily_rows(station, start, days, temperature, rainfall):
+    day = date.fromisoformat(start)
+    for _ in range(days):
+        yield f'{station},{day.isoformat()},{temperature},{rainfall}'
+        day += timedelta(days=1)
+
+def test_station_season_qualifies_crops(catalog):
+    # June-October 2024: the whole Kharif window, 25°C and 5 mm a day
+    lines = ['station,date,temperature,rainfall', *daily_rows('A', '2024-06-01', 153, 25, 5)]
+    result, = weather.recommend_from_weather(lines, 'loam', 6.5, catalog=catalog)
+
+    assert result['station'] == 'A'
+    assert result['seasons']['Kharif'] == {'years': 1, 'mean_temperature': 25.0,
+                                           'mean_rainfall': 765.0, 'mean_humidity': None}
+    qualified = {crop['crop'] for crop in result['crops']}
+    # Maize: 20-30°C, 500-800 mm, loam, Kharif
+    assert 'Maize' in qualified and 'Rice' not in qualified
+
+def test_unknown_soil_type_is_rejected(catalog):
+    with pytest.raises(ValueError, match='Unknown soil type'):
+        list(weather.recommend_from_weather(['date,temperature,rainfall'], 'peat', 6.5, catalog=catalog))
+
+def test_cli_rejects_unknown_soil_type(tmp_path):
+    path = tmp_path / 'days.csv'
+    path.write_text('date,temperature,rainfall\n2024-06-01,25,5\n')
+    assert weather.main([str(path), '--soil-type', 'peat']) == 1
+
+@pytest.mark.parametrize('query, error', [
+    ('soil_type=loam&ph=abc', 'All values must be numbers'),
+    ('soil_type=loam&ph=15', 'pH must be between 0 and 14'),
+    ('soil_type=peat', 'Invalid soil type'),
+])
+def test_endpoint_rejects_bad_parameters(query, error):
+    response = main.app.test_client().post(f'/api/recommend/weather?{query}', data='date,temperature,rainfall\n')
+    assert response.status_code == 400
+    assert response.get_json()['errors'] == [error]
@@ -0,0 +1,216 @@
+"""Season recommendations from daily weather: python weather.py days.csv --soil-type loam
+
+Input is CSV with one row per station day: date (YYYY-MM-DD), temperature
+(daily mean, °C), rainfall (mm that day), optional humidity (%) and an
+optional station column, with each station's rows kept together. Rows are
+read once: every day is folded into the running totals of each season
+window (start_month..end_month from the seasons table) it falls in, so a
+station costs one small accumulator per season-year. When the station
+changes, its season-years with enough days are scored at once with the
+vectorized engine (mean temperature, cumulative rainfall) and one result
+per station reports how often each crop would have qualified.
+"""
+import argparse
+import calendar
+import csv
+import json
+import logging
+import math
+import sys
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Share of a season's days that must be present for the season-year to count
+MIN_COVERAGE = 0.8
+STATION_COLUMNS = ('station', 'station_id')
+# Accumulator slots: days, temperature sum, rainfall sum, humidity sum, humidity days
+DAYS, TEMP, RAIN, HUMIDITY, HUMIDITY_DAYS = range(5)
+
+class SeasonWindows:
+    """Seasons covering each month, and the days a season-year should have"""
+
+    def __init__(self, seasons):
+        self.names = []
+        self.starts = []
+        self.ends = []
+        by_month = [[] for _ in range(13)]
+        for season in seasons:
+            start, end = season['start_month'], season['end_month']
+            if not (start and end):
+                continue
+            index = len(self.names)
+            self.names.append(season['name'])
+            self.starts.append(start)
+            self.ends.append(end)
+            months = range(start, end + 1) if start <= end else [*range(start, 13), *range(1, end + 1)]
+            for month in months:
+                by_month[month].append((index, start))
+        self.by_month = [tuple(windows) for windows in by_month]
+
+    def expected_days(self, index, year):
+        """Days in the season-year starting in year (wrapping seasons end in year + 1)"""
+        start, end = self.starts[index], self.ends[index]
+        months = ([(year, m) for m in range(start, end + 1)] if start <= end else
+                  [(year, m) for m in range(start, 13)] + [(year + 1, m) for m in range(1, end + 1)])
+        return sum(calendar.monthrange(y, m)[1] for y, m in months)
+
+def _number(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+def station_seasons(lines, windows):
+    """Yield (station, {(season index, year): totals}, skipped rows) per station group"""
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = {name.strip().lower(): i for i, name in enumerate(header)}
+    missing = [name for name in ('date', 'temperature', 'rainfall') if name not in columns]
+    if missing:
+        raise ValueError(f"Weather CSV needs columns: {', '.join(missing)}")
+    date_col, temp_col, rain_col = columns['date'], columns['temperature'], columns['rainfall']
+    humidity_col = columns.get('humidity')
+    station_col = next((columns[name] for name in STATION_COLUMNS if name in columns), None)
+    width = max(columns.values()) + 1
+    by_month = windows.by_month
+
+    station, totals, skipped = None, {}, 0
+    # Accumulators of the current month; consecutive days reuse them
+    month_key, month_accs = None, ()
+    for row in reader:
+        if len(row) < width:
+            skipped += 1
+            continue
+        row_station = row[station_col] if station_col is not None else ''
+        if row_station != station:
+            if totals or skipped:
+                yield station, totals, skipped
+            station, totals, skipped = row_station, {}, 0
+            month_key = None
+        temp = _number(row[temp_col])
+        rain = _number(row[rain_col])
+        if temp is None or rain is None:
+            skipped += 1
+            continue
+        day = row[date_col]
+        if day[:7] != month_key:
+            try:
+                year, month = int(day[:4]), int(day[5:7])
+            except ValueError:
+                month = 0
+            if not 1 <= month <= 12 or day[4:5] != '-':
+                skipped += 1
+                continue
+            month_key = day[:7]
+            month_accs = tuple(
+                totals.setdefault((index, year if month >= start else year - 1), [0, 0.0, 0.0, 0.0, 0])
+                for index, start in by_month[month])
+        humidity = _number(row[humidity_col]) if humidity_col is not None else None
+        for acc in month_accs:
+            acc[DAYS] += 1
+            acc[TEMP] += temp
+            acc[RAIN] += rain
+            if humidity is not None:
+                acc[HUMIDITY] += humidity
+                acc[HUMIDITY_DAYS] += 1
+    if totals or skipped:
+        yield station, totals, skipped
+
+def score_station(engine, windows, station, totals, soil_mask, ph, min_coverage=MIN_COVERAGE):
+    """Result dict for one station's season-year totals"""
+    keys = [key for key, acc in totals.items()
+            if acc[DAYS] >= min_coverage * windows.expected_days(*key)]
+    result = {'station': station, 'season_years': len(keys),
+              'incomplete': len(totals) - len(keys), 'seasons': {}, 'crops': []}
+    if not keys:
+        return result
+
+    accs = [totals[key] for key in keys]
+    seasons = np.array([index for index, _ in keys])
+    temps = np.array([acc[TEMP] / acc[DAYS] for acc in accs])
+    rains = np.array([acc[RAIN] for acc in accs])
+    season_masks = np.array([engine.season_mask_for(name) for name in windows.names], dtype=np.int64)
+    scores, eligible = engine.evaluate(temps, rains, soil_mask, ph, season_masks[seasons])
+    qualified = eligible.sum(axis=0)
+
+    by_season = {}
+    for index, name in enumerate(windows.names):
+        rows = seasons == index
+        if not rows.any():
+            continue
+        humidity = [acc[HUMIDITY] / acc[HUMIDITY_DAYS] for acc, here in zip(accs, rows)
+                    if here and acc[HUMIDITY_DAYS]]
+        result['seasons'][name] = {
+            'years': int(rows.sum()),
+            'mean_temperature': round(float(temps[rows].mean()), 2),
+            'mean_rainfall': round(float(rains[rows].mean()), 1),
+            'mean_humidity': round(sum(humidity) / len(humidity), 1) if humidity else None,
+        }
+        by_season[name] = eligible[rows].sum(axis=0)
+
+    names = engine.names
+    # Most often qualifying first; ties keep catalog order
+    for j in np.argsort(-qualified, kind='stable'):
+        if not qualified[j]:
+            break
+        result['crops'].append({
+            'crop': names[j],
+            'qualified': int(qualified[j]),
+            'frequency': round(int(qualified[j]) / len(keys), 3),
+            'by_season': {name: int(counts[j]) for name, counts in by_season.items() if counts[j]},
+        })
+    return result
+
+def recommend_from_weather(lines, soil_type, ph, catalog=None, min_coverage=MIN_COVERAGE):
+    """Yield one result dict per station in a daily weather CSV.
+
+    Raises ValueError for a soil type the catalog does not know or a CSV
+    without the needed columns.
+    """
+    if catalog is None:
+        from catalog import get_catalog
+        catalog = get_catalog()
+    soil_type = soil_type.lower()
+    if soil_type not in catalog.soil_types:
+        raise ValueError(f"Unknown soil type {soil_type!r}, expected one of {', '.join(catalog.soil_types)}")
+    engine = catalog.engine
+    windows = SeasonWindows(catalog.seasons)
+    soil_mask = engine.soil_mask_for(soil_type)
+    for station, totals, skipped in station_seasons(lines, windows):
+        result = score_station(engine, windows, station, totals, soil_mask, ph, min_coverage)
+        result['skipped_rows'] = skipped
+        yield result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='How often each crop qualifies per season, from daily weather series')
+    parser.add_argument('input', help="daily weather CSV, or '-' for stdin")
+    parser.add_argument('--soil-type', required=True, help='soil type of the stations')
+    parser.add_argument('--ph', type=float, default=6.5, help='soil pH (default 6.5)')
+    parser.add_argument('--min-coverage', type=float, default=MIN_COVERAGE,
+                        help='share of days a season-year needs to be scored')
+    parser.add_argument('-o', '--output', help='NDJSON output file (default: stdout)')
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.input == '-' else open(args.input, newline='')
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        for result in recommend_from_weather(source, args.soil_type, args.ph,
+                                             min_coverage=args.min_coverage):
+            out.write(json.dumps(result) + '\n')
+    except ValueError as e:
+        logger.error(f"Weather scoring failed: {str(e)}")
+        return 1
+    finally:
+        for f in (source, out):
+            if f not in (sys.stdin, sys.stdout):
+                f.close()
+    return 0
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+    sys.exit(main())